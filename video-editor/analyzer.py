@@ -1,118 +1,303 @@
 import os
+import re
 import json
+import base64
 import subprocess
 import tempfile
 import wave
-import struct
 import math
+import threading
+import contextlib
+import functools
+from collections import OrderedDict
+import numpy as np
+from media import get_registry
+from fillers import detect_fillers, redetect_fillers
+import tracing
 
 def extract_audio(video_path, output_wav=None):
     if output_wav is None:
         output_wav = tempfile.mktemp(suffix=".wav")
     cmd = ["ffmpeg","-y","-i",video_path,"-ar","16000","-ac","1","-vn",output_wav]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = tracing.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         raise RuntimeError(f"FFmpeg errore: {result.stderr}")
     return output_wav
 
 def get_video_duration(video_path):
     cmd = ["ffprobe","-v","quiet","-print_format","json","-show_format",video_path]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = tracing.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         return 0.0
     data = json.loads(result.stdout)
     return float(data.get("format",{}).get("duration",0))
 
-def read_wav_samples(wav_path):
-    with wave.open(wav_path,"rb") as wf:
-        n_channels = wf.getnchannels()
-        sample_width = wf.getsampwidth()
-        framerate = wf.getframerate()
-        n_frames = wf.getnframes()
-        raw = wf.readframes(n_frames)
-    if sample_width == 2:
-        samples_all = list(struct.unpack(f"<{n_frames*n_channels}h", raw))
+def _wav_frames(wf, n_frames):
+    n_channels = wf.getnchannels()
+    raw = wf.readframes(n_frames)
+    if wf.getsampwidth() == 2:
+        samples = np.frombuffer(raw, dtype="<i2", count=len(raw)//2)
     else:
-        samples_all = [s-128 for s in struct.unpack(f"{n_frames*n_channels}B", raw)]
+        samples = np.frombuffer(raw, dtype=np.uint8, count=len(raw)).astype(np.int16) - 128
     if n_channels > 1:
-        samples = [sum(samples_all[i:i+n_channels])/n_channels for i in range(0,len(samples_all),n_channels)]
-    else:
-        samples = samples_all
-    return samples, framerate
+        samples = samples[:len(samples)//n_channels*n_channels].reshape(-1, n_channels).mean(axis=1)
+    return samples
+
+def read_wav_samples(wav_path):
+    with wave.open(wav_path,"rb") as wf:
+        return _wav_frames(wf, wf.getnframes()), wf.getframerate()
 
 def compute_rms(samples, start, end):
-    chunk = samples[start:end]
-    if not chunk:
+    chunk = np.asarray(samples[start:end], dtype=np.float64)
+    if not chunk.size:
         return 0.0
-    return math.sqrt(sum(s*s for s in chunk)/len(chunk))
+    return math.sqrt(float(np.dot(chunk, chunk))/chunk.size)
 
-def detect_silences(wav_path, silence_threshold_db=-40.0, min_silence_duration=0.5, frame_duration=0.02):
-    samples, sr = read_wav_samples(wav_path)
-    frame_size = int(sr * frame_duration)
+def compute_frame_rms(samples, frame_size, block_frames=8192):
     n_frames = len(samples) // frame_size
-    threshold = 32767.0 * (10 ** (silence_threshold_db / 20.0)) if silence_threshold_db > -96 else 0.0
-    is_silent = [compute_rms(samples, i*frame_size, (i+1)*frame_size) < threshold for i in range(n_frames)]
+    rms = np.empty(n_frames, dtype=np.float64)
+    for b in range(0, n_frames, block_frames):
+        e = min(b + block_frames, n_frames)
+        frames = np.asarray(samples[b*frame_size:e*frame_size], dtype=np.float64).reshape(e - b, frame_size)
+        rms[b:e] = np.einsum("ij,ij->i", frames, frames) / frame_size
+    return np.sqrt(rms, out=rms)
+
+def silence_threshold(silence_threshold_db):
+    return 32767.0 * (10 ** (silence_threshold_db / 20.0)) if silence_threshold_db > -96 else 0.0
+
+def silences_from_rms(rms, silence_threshold_db=-40.0, min_silence_duration=0.5, frame_duration=0.02):
+    is_silent = np.asarray(rms) < silence_threshold(silence_threshold_db)
+    edges = np.diff(np.concatenate(([0], is_silent.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
     silences = []
-    in_silence = False
-    silence_start = 0.0
-    for i, silent in enumerate(is_silent):
-        t = i * frame_duration
-        if silent and not in_silence:
-            in_silence = True
-            silence_start = t
-        elif not silent and in_silence:
-            in_silence = False
-            dur = t - silence_start
-            if dur >= min_silence_duration:
-                silences.append({"start": silence_start, "end": t, "duration": dur, "type": "silence"})
-    if in_silence:
-        dur = n_frames*frame_duration - silence_start
+    for i, j in zip(starts.tolist(), ends.tolist()):
+        silence_start = i * frame_duration
+        t = j * frame_duration
+        dur = t - silence_start
         if dur >= min_silence_duration:
-            silences.append({"start": silence_start, "end": n_frames*frame_duration, "duration": dur, "type": "silence"})
+            silences.append({"start": silence_start, "end": t, "duration": dur, "type": "silence"})
     return silences
 
-FILLER_WORDS_IT = ["ehm","ehmm","uh","uhh","ah","ahh","allora","tipo","cioè","praticamente","diciamo","insomma","ecco","dunque","vabbè","boh","mah"]
-FILLER_WORDS_EN = ["um","uh","uhh","er","ah","like","you know","basically","literally","actually","so","right","i mean","well"]
+def wav_rms_envelope(wav_path, frame_duration=0.02):
+    samples, sr = read_wav_samples(wav_path)
+    return compute_frame_rms(samples, int(sr * frame_duration))
+
+def detect_silences(wav_path, silence_threshold_db=-40.0, min_silence_duration=0.5, frame_duration=0.02):
+    return silences_from_rms(wav_rms_envelope(wav_path, frame_duration), silence_threshold_db, min_silence_duration, frame_duration)
+
+def encode_envelope(rms, frame_duration=0.02):
+    data = np.asarray(rms, dtype="<f4").tobytes()
+    return {"frame_duration": frame_duration, "dtype": "float32", "data": base64.b64encode(data).decode("ascii")}
+
+@functools.lru_cache(maxsize=64)
+def _decode_envelope_data(data):
+    return np.frombuffer(base64.b64decode(data), dtype="<f4")
+
+def decode_envelope(envelope):
+    return _decode_envelope_data(envelope["data"])
+
+def recompute_silences(analysis, silence_threshold_db=-40.0, min_silence_duration=0.5):
+    envelope = analysis.get("rms_envelope")
+    if not envelope:
+        return analysis.get("silences", [])
+    analysis["silences"] = silences_from_rms(decode_envelope(envelope), silence_threshold_db, min_silence_duration, envelope["frame_duration"])
+    return analysis["silences"]
+
+def _pcm_chunks(pipe, chunk_bytes):
+    carry = b""
+    while True:
+        buf = pipe.read(chunk_bytes)
+        if not buf:
+            break
+        if carry:
+            buf, carry = carry + buf, b""
+        if len(buf) % 2:
+            buf, carry = buf[:-1], buf[-1:]
+        yield np.frombuffer(buf, dtype="<i2")
+
+def pipe_pcm(cmd, sinks=(), sample_rate=16000, chunk_seconds=2.0, extra_output=None):
+    with tempfile.TemporaryFile() as err, tracing.subprocess_span(cmd) as sp:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=err)
+        finished = False
+        nbytes = 0
+        try:
+            for chunk in _pcm_chunks(proc.stdout, int(sample_rate * chunk_seconds) * 2):
+                nbytes += chunk.nbytes
+                for sink in sinks:
+                    sink.feed(chunk)
+            finished = True
+        finally:
+            proc.stdout.close()
+            if not finished and proc.poll() is None:
+                proc.kill()
+            returncode = proc.wait()
+            for sink in sinks:
+                sink.close()
+            sp.set(exit_code=returncode, bytes_out=nbytes + (tracing.output_bytes(extra_output) if extra_output else 0))
+        err.seek(0)
+        log = err.read().decode("utf-8", "replace")
+    if returncode != 0:
+        raise RuntimeError(f"FFmpeg errore: {log[-2000:]}")
+    return log
+
+class SilenceDetector:
+    def __init__(self, sample_rate=16000, frame_duration=0.02):
+        self.frame_duration = frame_duration
+        self.frame_size = int(sample_rate * frame_duration)
+        self._tail = np.empty(0, dtype=np.int16)
+        self._rms = []
+
+    def feed(self, samples):
+        if self._tail.size:
+            samples = np.concatenate((self._tail, samples))
+        n = len(samples) // self.frame_size * self.frame_size
+        if n:
+            self._rms.append(compute_frame_rms(samples[:n], self.frame_size))
+        self._tail = samples[n:]
+
+    def close(self):
+        pass
+
+    @property
+    def rms(self):
+        if len(self._rms) != 1:
+            self._rms = [np.concatenate(self._rms) if self._rms else np.empty(0)]
+        return self._rms[0]
 
-def transcribe_with_whisper(wav_path, language="it", model_size="base"):
+    def silences(self, silence_threshold_db=-40.0, min_silence_duration=0.5):
+        return silences_from_rms(self.rms, silence_threshold_db, min_silence_duration, self.frame_duration)
+
+class WavWriter:
+    def __init__(self, wav_path, sample_rate=16000):
+        self._wf = wave.open(wav_path, "wb")
+        self._wf.setnchannels(1)
+        self._wf.setsampwidth(2)
+        self._wf.setframerate(sample_rate)
+
+    def feed(self, samples):
+        self._wf.writeframesraw(samples.tobytes())
+
+    def close(self):
+        self._wf.close()
+
+WHISPER_MODEL_MB = {"tiny":150,"base":300,"small":900,"medium":2500,"large-v2":5000,"large-v3":5000}
+WHISPER_CACHE_BUDGET_MB = 1200
+_whisper_models = OrderedDict()
+_whisper_lock = threading.Lock()
+
+def set_whisper_cache_budget(budget_mb):
+    global WHISPER_CACHE_BUDGET_MB
+    with _whisper_lock:
+        WHISPER_CACHE_BUDGET_MB = budget_mb
+        _evict_whisper_models()
+
+def _evict_whisper_models():
+    while len(_whisper_models) > 1 and sum(WHISPER_MODEL_MB.get(k[0], 1000) for k in _whisper_models) > WHISPER_CACHE_BUDGET_MB:
+        _whisper_models.popitem(last=False)
+
+def get_whisper_model(model_size="base", device="auto", compute_type="int8"):
+    from faster_whisper import WhisperModel
+    key = (model_size, device, compute_type)
+    with _whisper_lock:
+        if key in _whisper_models:
+            _whisper_models.move_to_end(key)
+            return _whisper_models[key]
+        model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        _whisper_models[key] = model
+        _evict_whisper_models()
+        return model
+
+def clear_whisper_models():
+    with _whisper_lock:
+        _whisper_models.clear()
+
+SPEECH_PAD = 0.25
+SPEECH_MAX_CHUNK = 30.0
+SPEECH_MAX_GAP = 2.0
+SPEECH_SILENCE_DB = -50.0
+SPEECH_MIN_SILENCE = 1.0
+
+def speech_intervals(silences, duration, pad=SPEECH_PAD, max_chunk=SPEECH_MAX_CHUNK, max_gap=SPEECH_MAX_GAP):
+    spans = []
+    t = 0.0
+    for s in sorted(silences, key=lambda x: x["start"]):
+        if s["start"] > t:
+            spans.append([max(0.0, t - pad), min(duration, s["start"] + pad)])
+        t = max(t, s["end"])
+    if t < duration:
+        spans.append([max(0.0, t - pad), duration])
+    chunks = []
+    for a, b in spans:
+        if chunks:
+            a = max(a, chunks[-1][1])
+            if a - chunks[-1][1] <= max_gap and b - chunks[-1][0] <= max_chunk:
+                chunks[-1][1] = max(chunks[-1][1], b)
+                continue
+        while b - a > max_chunk:
+            chunks.append([a, a + max_chunk])
+            a += max_chunk
+        chunks.append([a, b])
+    return [(a, b) for a, b in chunks if b > a]
+
+def _collect_transcript(segments_raw, offset, segments, full_text):
+    for seg in segments_raw:
+        words = [{"word": w.word.strip(), "start": w.start + offset, "end": w.end + offset, "probability": w.probability} for w in seg.words or []]
+        segments.append({"start": seg.start + offset, "end": seg.end + offset, "text": seg.text.strip(), "words": words, "fillers": []})
+        full_text.append(seg.text.strip())
+
+def transcribe_with_whisper(wav_path, language="it", model_size="base", device="auto", compute_type="int8", speech=None, filler_words=()):
     try:
-        from faster_whisper import WhisperModel
+        model = get_whisper_model(model_size, device, compute_type)
     except ImportError:
         return {"text":"","segments":[],"filler_segments":[],"error":"faster-whisper non installato"}
-    model = WhisperModel(model_size, device="auto", compute_type="int8")
-    segments_raw, info = model.transcribe(wav_path, language=language, word_timestamps=True, vad_filter=True)
     segments = []
-    filler_segments = []
     full_text = []
-    filler_list = FILLER_WORDS_IT if language == "it" else FILLER_WORDS_EN
-    for seg in segments_raw:
-        words = []
-        seg_fillers = []
-        if seg.words:
-            for w in seg.words:
-                wi = {"word": w.word.strip(), "start": w.start, "end": w.end, "probability": w.probability}
-                words.append(wi)
-                wl = w.word.strip().lower()
-                if any(wl == f or wl.startswith(f) for f in filler_list):
-                    filler_segments.append({"start": w.start, "end": w.end, "word": w.word.strip(), "type": "filler"})
-                    seg_fillers.append(wi)
-        segments.append({"start": seg.start, "end": seg.end, "text": seg.text.strip(), "words": words, "fillers": seg_fillers})
-        full_text.append(seg.text.strip())
-    return {"text": " ".join(full_text), "segments": segments, "filler_segments": filler_segments, "language": info.language, "duration": info.duration}
+    if speech is None:
+        segments_raw, info = model.transcribe(wav_path, language=language, word_timestamps=True, vad_filter=True)
+        _collect_transcript(segments_raw, 0.0, segments, full_text)
+        result = {"text": " ".join(full_text), "segments": segments, "language": info.language, "duration": info.duration}
+    else:
+        detected = language
+        with wave.open(wav_path, "rb") as wf:
+            sr, n_frames = wf.getframerate(), wf.getnframes()
+            for a, b in speech:
+                start = min(int(a*sr), n_frames)
+                wf.setpos(start)
+                audio = np.asarray(_wav_frames(wf, max(0, int(b*sr) - start)), dtype=np.float32) / 32768.0
+                if sr != 16000 or audio.size < sr // 10:
+                    continue
+                segments_raw, info = model.transcribe(audio, language=language, word_timestamps=True, vad_filter=False, condition_on_previous_text=False)
+                _collect_transcript(segments_raw, a, segments, full_text)
+                detected = info.language
+        result = {"text": " ".join(full_text), "segments": segments, "language": detected, "duration": n_frames / sr if sr else 0.0, "speech_chunks": len(speech)}
+    detect_fillers(result, language, filler_words)
+    return result
 
-def detect_best_scenes(video_path, sample_every_n_seconds=2.0, top_percent=0.3):
-    try:
-        import cv2
-        import numpy as np
-    except ImportError:
-        return []
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if fps <= 0:
-        cap.release()
+SCENE_ANALYSIS_WIDTH = 480
+SCENE_BATCH_SIZE = 32
+
+def brightness_factor(brightness):
+    return np.where((brightness >= 80) & (brightness <= 170), 1.0, np.where((brightness < 50) | (brightness > 210), 0.3, 0.7))
+
+def score_frame_batch(frames):
+    f = np.asarray(frames, dtype=np.float32)
+    lap = f[:,:-2,1:-1] + f[:,2:,1:-1] + f[:,1:-1,:-2] + f[:,1:-1,2:] - 4.0*f[:,1:-1,1:-1]
+    sharpness = lap.reshape(len(f), -1).var(axis=1, dtype=np.float64)
+    brightness = f.reshape(len(f), -1).mean(axis=1, dtype=np.float64)
+    return sharpness * brightness_factor(brightness)
+
+def select_best_scenes(scores, top_percent=0.3):
+    if not scores:
         return []
-    frame_interval = int(fps * sample_every_n_seconds)
+    scores.sort(key=lambda x: x["score"], reverse=True)
+    best = scores[:max(1, int(len(scores)*top_percent))]
+    for s in best:
+        s["type"] = "best_scene"
+    best.sort(key=lambda x: x["timestamp"])
+    return best
+
+def _score_scenes_seek(cap, cv2, fps, total_frames, frame_interval):
     scores = []
     frame_idx = 0
     while frame_idx < total_frames:
@@ -126,55 +311,227 @@ def detect_best_scenes(video_path, sample_every_n_seconds=2.0, top_percent=0.3):
         bs = 1.0 if 80 <= brightness <= 170 else (0.3 if brightness < 50 or brightness > 210 else 0.7)
         scores.append({"timestamp": frame_idx/fps, "score": sharpness*bs, "type": "scene_score"})
         frame_idx += frame_interval
-    cap.release()
-    if not scores:
-        return []
-    scores.sort(key=lambda x: x["score"], reverse=True)
-    best = scores[:max(1, int(len(scores)*top_percent))]
-    for s in best:
-        s["type"] = "best_scene"
-    best.sort(key=lambda x: x["timestamp"])
-    return best
+    return scores
+
+def _score_scenes_sequential(cap, cv2, fps, frame_interval, analysis_width):
+    scores = []
+    batch, stamps = [], []
+    def flush():
+        for ts, sc in zip(stamps, score_frame_batch(batch).tolist()):
+            scores.append({"timestamp": ts, "score": sc, "type": "scene_score"})
+        batch.clear()
+        stamps.clear()
+    frame_idx = 0
+    while True:
+        if frame_idx % frame_interval:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            h, w = gray.shape
+            if analysis_width and w > analysis_width:
+                gray = cv2.resize(gray, (analysis_width, max(3, round(h*analysis_width/w))), interpolation=cv2.INTER_AREA)
+            batch.append(gray)
+            stamps.append(frame_idx/fps)
+            if len(batch) >= SCENE_BATCH_SIZE:
+                flush()
+        frame_idx += 1
+    if batch:
+        flush()
+    return scores
 
-def detect_music_beats(audio_path):
+def detect_best_scenes(video_path, sample_every_n_seconds=2.0, top_percent=0.3, mode="sequential", analysis_width=SCENE_ANALYSIS_WIDTH):
     try:
-        import librosa
+        import cv2
     except ImportError:
         return []
-    y, sr = librosa.load(audio_path, sr=None, mono=True)
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if fps <= 0:
+        cap.release()
+        return []
+    frame_interval = max(1, int(fps * sample_every_n_seconds))
+    try:
+        if mode == "seek":
+            scores = _score_scenes_seek(cap, cv2, fps, total_frames, frame_interval)
+        else:
+            scores = _score_scenes_sequential(cap, cv2, fps, frame_interval, analysis_width)
+    finally:
+        cap.release()
+    return select_best_scenes(scores, top_percent)
+
+SHOWINFO_PTS = re.compile(r"Parsed_showinfo.*?pts_time:\s*(-?[0-9.]+)")
+
+def demux_clip(video_path, media, audio_sinks=(), scene_every=None, analysis_width=SCENE_ANALYSIS_WIDTH, sample_rate=16000, chunk_seconds=2.0):
+    out = {"keyframes": None, "scene_scores": None}
+    cmd = ["ffmpeg","-y","-nostdin","-hide_banner","-nostats","-v","info","-i",video_path]
+    frames_path = None
+    if scene_every:
+        w = min(analysis_width, media["width"])
+        h = max(2, int(round(media["height"] * w / media["width"] / 2)) * 2)
+        fd, frames_path = tempfile.mkstemp(suffix=".gray")
+        os.close(fd)
+        cmd += ["-filter_complex", f"[0:v:0]split=2[vs][vk];[vs]fps=1/{scene_every},scale={w}:{h},format=gray[scn];[vk]select='eq(key,1)',showinfo,nullsink"]
+    if audio_sinks:
+        cmd += ["-map","0:a:0","-ac","1","-ar",str(sample_rate),"-f","s16le","pipe:1"]
+    if frames_path:
+        cmd += ["-map","[scn]","-f","rawvideo","-pix_fmt","gray",frames_path]
+    try:
+        log = pipe_pcm(cmd, audio_sinks, sample_rate, chunk_seconds, frames_path)
+        if frames_path:
+            out["keyframes"] = sorted(float(t) for t in SHOWINFO_PTS.findall(log))
+            n = os.path.getsize(frames_path) // (w * h) if os.path.exists(frames_path) else 0
+            scores = []
+            if n:
+                frames = np.memmap(frames_path, dtype=np.uint8, mode="r", shape=(n, h, w))
+                for b in range(0, n, SCENE_BATCH_SIZE):
+                    for k, sc in enumerate(score_frame_batch(frames[b:b+SCENE_BATCH_SIZE]).tolist(), start=b):
+                        scores.append({"timestamp": k * scene_every, "score": sc, "type": "scene_score"})
+                del frames
+            out["scene_scores"] = scores
+    finally:
+        if frames_path and os.path.exists(frames_path):
+            os.remove(frames_path)
+    return out
+
+BEAT_ANALYSIS_SR = 22050
+
+def _music_beats(audio_path, sr=BEAT_ANALYSIS_SR):
+    import librosa
+    y, sr = librosa.load(audio_path, sr=sr, mono=True)
     tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-    return librosa.frames_to_time(beat_frames, sr=sr).tolist()
+    return {"beats": librosa.frames_to_time(beat_frames, sr=sr).tolist(), "duration": len(y) / sr}
 
-def analyze_clip(video_path, options=None):
+def detect_music_beats(audio_path, sr=BEAT_ANALYSIS_SR):
+    try:
+        return _music_beats(audio_path, sr)["beats"]
+    except ImportError:
+        return []
+
+def analyze_project_beats(music_files, cache=None, sr=BEAT_ANALYSIS_SR):
+    if isinstance(music_files, str):
+        music_files = [music_files]
+    beats = []
+    offset = 0.0
+    for path in music_files:
+        if not path:
+            continue
+        params = {"sr": sr}
+        track = cache.lookup(path, "beats", params) if cache is not None else None
+        if track is None:
+            try:
+                with tracing.span("beats", clip=os.path.basename(path)):
+                    track = _music_beats(path, sr)
+            except ImportError:
+                return []
+            if cache is not None:
+                cache.store(path, "beats", params, track)
+        beats.extend(offset + b for b in track["beats"])
+        offset += track["duration"]
+    return sorted(set(round(b, 4) for b in beats))
+
+def analyze_clip(video_path, options=None, stage=None, cache=None):
     if options is None:
         options = {}
-    results = {"video_path": video_path, "filename": os.path.basename(video_path), "duration": 0.0, "silences": [], "transcription": {}, "filler_segments": [], "best_scenes": [], "beat_times": [], "errors": []}
-    results["duration"] = get_video_duration(video_path)
+    if stage is None:
+        stage = lambda name: contextlib.nullcontext()
+    def cached(name, params):
+        return cache.lookup(video_path, name, params) if cache is not None else None
+    def store(name, params, value):
+        if cache is not None:
+            cache.store(video_path, name, params, value)
+    results = {"video_path": video_path, "filename": os.path.basename(video_path), "duration": 0.0, "media": {}, "silences": [], "transcription": {}, "filler_segments": [], "best_scenes": [], "beat_times": [], "errors": []}
+    registry = get_registry()
+    with stage("probe"), tracing.span("probe"):
+        media = registry.get(video_path)
+    results["duration"] = media["duration"]
+    results["media"] = media
+    run_transcription = options.get("run_transcription", True)
+    run_scenes = options.get("run_scene_detection", True)
+    sil_params = {"silence_threshold_db": options.get("silence_threshold_db",-40.0), "min_silence_duration": options.get("min_silence_duration",0.5)}
+    trans_params = {"language": options.get("transcription_language","it"), "model": options.get("whisper_model","base"), "compute_type": options.get("whisper_compute_type","int8")}
+    speech_only = options.get("transcription_mode","speech") == "speech"
+    if speech_only:
+        trans_params.update(mode="speech", speech_silence_db=SPEECH_SILENCE_DB, speech_min_silence=SPEECH_MIN_SILENCE)
+    scene_params = {"sample_every_n_seconds": options.get("scene_sample_seconds",2.0), "top_percent": options.get("scene_top_percent",0.3), "mode": options.get("scene_mode","demux"), "analysis_width": options.get("scene_analysis_width",SCENE_ANALYSIS_WIDTH)}
+    envelope = cached("envelope", {"frame_duration": 0.02})
+    trans = cached("transcription", trans_params) if run_transcription else None
+    scenes = cached("scenes", scene_params) if run_scenes else None
+    need_wav = run_transcription and trans is None
+    need_audio = envelope is None or need_wav
+    stream = options.get("stream_audio", True)
+    demux_scenes = stream and run_scenes and scenes is None and scene_params["mode"] == "demux" and media.get("width",0) > 0
     tmp_wav = tempfile.mktemp(suffix=".wav")
     try:
-        extract_audio(video_path, tmp_wav)
+        if need_audio or demux_scenes:
+            with stage("demux"), tracing.span("demux"):
+                if stream:
+                    sinks = []
+                    if need_audio:
+                        detector = SilenceDetector()
+                        sinks.append(detector)
+                        if need_wav:
+                            sinks.append(WavWriter(tmp_wav))
+                    demux = demux_clip(video_path, media, sinks, scene_params["sample_every_n_seconds"] if demux_scenes else None, scene_params["analysis_width"])
+                    if demux["keyframes"] is not None and media["duration"] > 0:
+                        media = registry.update(video_path, keyframes=demux["keyframes"])
+                        results["media"] = media
+                else:
+                    extract_audio(video_path, tmp_wav)
     except Exception as e:
         results["errors"].append(str(e))
+        if os.path.exists(tmp_wav):
+            os.remove(tmp_wav)
         return results
     try:
-        results["silences"] = detect_silences(tmp_wav, options.get("silence_threshold_db",-40.0), options.get("min_silence_duration",0.5))
-        if options.get("run_transcription", True):
-            trans = transcribe_with_whisper(tmp_wav, options.get("transcription_language","it"), options.get("whisper_model","base"))
+        if envelope is None:
+            with stage("silence"), tracing.span("silence"):
+                envelope = encode_envelope(detector.rms if stream else wav_rms_envelope(tmp_wav))
+            store("envelope", {"frame_duration": 0.02}, envelope)
+        results["rms_envelope"] = envelope
+        recompute_silences(results, sil_params["silence_threshold_db"], sil_params["min_silence_duration"])
+        if run_transcription:
+            if trans is None:
+                with stage("transcription"), tracing.span("transcription"):
+                    speech = None
+                    if speech_only and results["duration"] > 0:
+                        gaps = silences_from_rms(decode_envelope(envelope), SPEECH_SILENCE_DB, SPEECH_MIN_SILENCE, envelope["frame_duration"])
+                        speech = speech_intervals(gaps, results["duration"])
+                    trans = transcribe_with_whisper(tmp_wav, trans_params["language"], trans_params["model"], options.get("whisper_device","auto"), trans_params["compute_type"], speech)
+                if not trans.get("error"):
+                    store("transcription", trans_params, trans)
             results["transcription"] = trans
-            results["filler_segments"] = trans.get("filler_segments",[])
-        if options.get("run_scene_detection", True):
-            results["best_scenes"] = detect_best_scenes(video_path)
-        if options.get("run_beat_detection", False) and options.get("audio_file_for_beats"):
-            results["beat_times"] = detect_music_beats(options["audio_file_for_beats"])
+            redetect_fillers(results, trans_params["language"], options.get("filler_words", ()))
+        if run_scenes:
+            if scenes is None:
+                with stage("scenes"), tracing.span("scenes"):
+                    if demux_scenes:
+                        scenes = select_best_scenes(demux["scene_scores"], scene_params["top_percent"])
+                    else:
+                        scenes = detect_best_scenes(video_path, **scene_params)
+                store("scenes", scene_params, scenes)
+            results["best_scenes"] = scenes
     finally:
         if os.path.exists(tmp_wav):
             os.remove(tmp_wav)
     return results
 
 def save_analysis(results, output_path):
+    if output_path.endswith(".npz"):
+        from store import save_project
+        return save_project(results, output_path)
+    if isinstance(results, list):
+        results = [r.materialize() if hasattr(r, "materialize") else r for r in results]
     with open(output_path,"w",encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
 
 def load_analysis(json_path):
+    if json_path.endswith(".npz"):
+        from store import load_project
+        return load_project(json_path)
     with open(json_path,"r",encoding="utf-8") as f:
         return json.load(f)
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analyzer import detect_best_scenes
+
+def make_test_clip(path, seconds=300, size="3840x2160", gop=250):
+    cmd = ["ffmpeg","-y","-v","error","-f","lavfi","-i",f"testsrc2=size={size}:rate=25","-t",str(seconds),"-c:v","libx264","-preset","ultrafast","-g",str(gop),"-pix_fmt","yuv420p",path]
+    subprocess.run(cmd, check=True)
+    return path
+
+def time_mode(video_path, mode, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        scenes = detect_best_scenes(video_path, mode=mode)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, len(scenes)
+
+def main():
+    ap = argparse.ArgumentParser(description="Confronta lo scoring scene con seek e con decodifica sequenziale")
+    ap.add_argument("video", nargs="?", help="clip da analizzare (default: clip sintetica 4K H.264)")
+    ap.add_argument("--seconds", type=int, default=300)
+    ap.add_argument("--size", default="3840x2160")
+    ap.add_argument("--gop", type=int, default=250)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+    tmp = None
+    video = args.video
+    if not video:
+        tmp = tempfile.mkdtemp()
+        video = make_test_clip(os.path.join(tmp, "bench_scenes.mp4"), args.seconds, args.size, args.gop)
+    try:
+        t_seek, n_seek = time_mode(video, "seek", args.repeat)
+        t_seq, n_seq = time_mode(video, "sequential", args.repeat)
+        print(f"seek:       {t_seek:8.2f}s  ({n_seek} scene)")
+        print(f"sequential: {t_seq:8.2f}s  ({n_seq} scene)")
+        print(f"speedup:    {t_seek/max(t_seq,1e-9):8.2f}x")
+    finally:
+        if tmp:
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+            os.rmdir(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from timeline import Segment, build_segments_from_analysis, sync_to_beats, BeatGrid
+
+def reference_scores(segments, best_scenes):
+    best_timestamps = {round(b["timestamp"],1): b["score"] for b in best_scenes}
+    for seg in segments:
+        if seg.keep:
+            center = (seg.start + seg.end) / 2
+            for ts, sc in best_timestamps.items():
+                if abs(center - ts) < 2.0:
+                    seg.score = sc
+                    break
+    return [s.score for s in segments]
+
+def reference_sync(segments, beat_times, tolerance=0.15):
+    def nearest_beat(t):
+        best = min(beat_times, key=lambda b: abs(b-t))
+        return best if abs(best-t) <= tolerance else t
+    out = []
+    for seg in segments:
+        ns, ne = nearest_beat(seg.start), nearest_beat(seg.end)
+        if ne <= ns:
+            ne = seg.end
+        out.append((ns, ne))
+    return out
+
+def synthetic_analysis(duration, rng):
+    silences, t = [], 0.0
+    while t < duration - 5:
+        t += rng.uniform(1.0, 8.0)
+        d = rng.uniform(0.5, 2.0)
+        silences.append({"start": t, "end": min(t+d, duration), "duration": d, "type": "silence"})
+        t += d
+    scenes = [{"timestamp": ts, "score": rng.uniform(10, 500), "type": "best_scene"} for ts in range(0, int(duration), 2) if rng.random() < 0.3]
+    return {"video_path": "synthetic.mp4", "filename": "synthetic.mp4", "duration": duration, "silences": silences, "filler_segments": [], "best_scenes": scenes}
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Confronta scoring scene e beat snapping indicizzati con l'implementazione lineare")
+    ap.add_argument("--hours", type=float, default=3.0)
+    ap.add_argument("--bpm", type=float, default=120.0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+    duration = args.hours * 3600
+    analysis = synthetic_analysis(duration, rng)
+    segs, t_new_build = timed(build_segments_from_analysis, analysis)
+    ref_segs = [Segment(s.video_path, s.start, s.end, s.clip_label, s.segment_type) for s in segs]
+    for r, s in zip(ref_segs, segs):
+        r.keep = s.keep
+    ref_scores, t_ref_scores = timed(reference_scores, ref_segs, analysis["best_scenes"])
+    assert ref_scores == [s.score for s in segs], "scene score diversi"
+    beats = [i * 60.0 / args.bpm + rng.uniform(-0.01, 0.01) for i in range(int(duration * args.bpm / 60))]
+    kept = [s for s in segs if s.keep]
+    ref_sync, t_ref_sync = timed(reference_sync, kept, beats)
+    new_sync, t_new_sync = timed(lambda: sync_to_beats(kept, BeatGrid(beats)))
+    assert ref_sync == [(s.start, s.end) for s in new_sync], "beat snapping diverso"
+    print(f"{len(segs)} segmenti, {len(analysis['best_scenes'])} scene, {len(beats)} beat")
+    print(f"scene score: lineare {t_ref_scores:8.3f}s  build indicizzata (totale) {t_new_build:8.3f}s")
+    print(f"beat sync:   lineare {t_ref_sync:8.3f}s  indicizzata {t_new_sync:8.3f}s  ({t_ref_sync/max(t_new_sync,1e-9):.0f}x)")
+
+if __name__ == "__main__":
+    main()
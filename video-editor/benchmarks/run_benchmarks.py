@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+from synth import ensure_clip
+
+STAGES = ["read_wav_samples","detect_silences","detect_best_scenes","build_segments_from_analysis","sync_to_beats","render_video","export_fcpxml","export_edl","export_csv","export_transcript"]
+PRESETS = {
+    "quick": {"durations": [60], "sizes": ["1280x720"], "gops": [25, 250]},
+    "standard": {"durations": [60, 600], "sizes": ["1280x720", "1920x1080"], "gops": [25, 250]},
+    "full": {"durations": [60, 600, 3600, 7200], "sizes": ["1280x720", "1920x1080", "3840x2160"], "gops": [25, 250]},
+}
+DEFAULT_MEDIA_DIR = os.path.join(os.path.expanduser("~"), ".weddingcut", "bench_media")
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1 / 1048576 if sys.platform == "darwin" else 1 / 1024
+    return round(max(self_kb, child_kb) * scale, 1)
+
+WAV_STAGES = ("read_wav_samples", "detect_silences")
+
+def prepare_inputs(video_path, duration, work_dir, stages):
+    from analyzer import detect_silences, extract_audio
+    if not any(st != "detect_best_scenes" for st in stages):
+        return
+    wav = extract_audio(video_path, os.path.join(work_dir, "audio.wav"))
+    silences = detect_silences(wav)
+    scenes = [{"timestamp": float(t), "score": 100.0 + (t * 37) % 400, "type": "best_scene"} for t in range(0, int(duration), 4)]
+    analysis = {"video_path": video_path, "filename": os.path.basename(video_path), "duration": duration, "silences": silences, "transcription": {"segments": []}, "filler_segments": [], "best_scenes": scenes}
+    with open(os.path.join(work_dir, "analysis.json"), "w", encoding="utf-8") as f:
+        json.dump(analysis, f)
+
+def run_stage(stage, video_path, duration, work_dir):
+    import analyzer, timeline, exporter
+    tmp = tempfile.mkdtemp()
+    try:
+        if stage in WAV_STAGES:
+            wav = os.path.join(work_dir, "audio.wav")
+            fn = (lambda: analyzer.read_wav_samples(wav)) if stage == "read_wav_samples" else (lambda: analyzer.detect_silences(wav))
+        elif stage == "detect_best_scenes":
+            fn = lambda: analyzer.detect_best_scenes(video_path)
+        else:
+            with open(os.path.join(work_dir, "analysis.json"), encoding="utf-8") as f:
+                analysis = json.load(f)
+            segs = timeline.auto_cut_timeline([analysis])
+            beats = [i * 0.5 for i in range(int(duration * 2))]
+            fn = {
+                "build_segments_from_analysis": lambda: timeline.build_segments_from_analysis(analysis),
+                "sync_to_beats": lambda: timeline.sync_to_beats(segs, beats),
+                "render_video": lambda: exporter.render_video(segs, os.path.join(tmp, "out.mp4")),
+                "export_fcpxml": lambda: exporter.export_fcpxml(segs, os.path.join(tmp, "out.fcpxml")),
+                "export_edl": lambda: exporter.export_edl(segs, os.path.join(tmp, "out.edl")),
+                "export_csv": lambda: exporter.export_csv(segs, os.path.join(tmp, "out.csv")),
+                "export_transcript": lambda: exporter.export_transcript([analysis], os.path.join(tmp, "out.txt")),
+            }[stage]
+        setup_rss = peak_rss_mb()
+        t0 = time.perf_counter()
+        fn()
+        wall = time.perf_counter() - t0
+    finally:
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+    return {"wall_s": round(wall, 6), "peak_rss_mb": peak_rss_mb(), "setup_rss_mb": setup_rss}
+
+def bench_case(video_path, case, duration, stages):
+    out = []
+    work_dir = tempfile.mkdtemp()
+    try:
+        prepare_inputs(video_path, duration, work_dir, stages)
+        for stage in stages:
+            cmd = [sys.executable, os.path.abspath(__file__), "--stage", stage, video_path, str(duration), work_dir]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            row = {"case": case, "stage": stage, "media_seconds": duration}
+            if proc.returncode != 0:
+                row["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            else:
+                row.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                row["throughput"] = round(duration / row["wall_s"], 2) if row["wall_s"] > 0 else None
+            out.append(row)
+            status = row.get("error") or f"{row['wall_s']:.4f}s  rss {row['peak_rss_mb']} MB (setup {row['setup_rss_mb']} MB)  {row['throughput']}x"
+            print(f"{case:<28} {stage:<30} {status}", flush=True)
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+    return out
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["case"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    print(f"{'caso':<28} {'stage':<30} {'prima':>9} {'dopo':>9} {'rapporto':>9}")
+    for r in new:
+        o = old.get((r["case"], r["stage"]))
+        if not o or "wall_s" not in o or "wall_s" not in r:
+            continue
+        ratio = o["wall_s"] / r["wall_s"] if r["wall_s"] else float("inf")
+        print(f"{r['case']:<28} {r['stage']:<30} {o['wall_s']:>8.3f}s {r['wall_s']:>8.3f}s {ratio:>8.2f}x")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--stage"]:
+        print(json.dumps(run_stage(argv[1], argv[2], float(argv[3]), argv[4])))
+        return 0
+    ap = argparse.ArgumentParser(description="Benchmark riproducibile delle fasi di analisi ed esportazione su media sintetici")
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    ap.add_argument("--durations", help="durate in secondi separate da virgola (sovrascrive il preset)")
+    ap.add_argument("--sizes", help="risoluzioni WxH separate da virgola")
+    ap.add_argument("--gops", help="lunghezze GOP separate da virgola")
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--media-dir", default=DEFAULT_MEDIA_DIR)
+    ap.add_argument("--output", default="bench_results.json")
+    ap.add_argument("--compare", nargs=2, metavar=("PRIMA", "DOPO"), help="confronta due file di risultati")
+    args = ap.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    matrix = dict(PRESETS[args.preset])
+    if args.durations:
+        matrix["durations"] = [float(d) for d in args.durations.split(",")]
+    if args.sizes:
+        matrix["sizes"] = args.sizes.split(",")
+    if args.gops:
+        matrix["gops"] = [int(g) for g in args.gops.split(",")]
+    stages = [s for s in args.stages.split(",") if s]
+    results = []
+    for duration in matrix["durations"]:
+        for size in matrix["sizes"]:
+            for gop in matrix["gops"]:
+                clip = ensure_clip(args.media_dir, duration, size, gop)
+                results += bench_case(clip, f"{int(duration)}s_{size}_g{gop}", duration, stages)
+    meta = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()}
+    try:
+        meta["git"] = subprocess.run(["git","rev-parse","--short","HEAD"], capture_output=True, text=True, cwd=HERE).stdout.strip()
+    except OSError:
+        pass
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "matrix": matrix, "results": results}, f, indent=2)
+    print(f"Risultati salvati in {args.output}")
+    return 1 if any("error" in r for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+import subprocess
+
+def media_name(duration, size, gop, speech_period=6.0, speech_on=3.0):
+    return f"synth_{int(duration)}s_{size}_g{gop}_p{speech_period:g}-{speech_on:g}.mp4"
+
+def make_synthetic_clip(path, duration=60, size="1280x720", gop=50, fps=25, speech_period=6.0, speech_on=3.0):
+    # tono a 440 Hz acceso per speech_on secondi ogni speech_period, silenzio nel resto
+    audio = f"[1:a]volume='if(lt(mod(t,{speech_period}),{speech_on}),1,0)':eval=frame[a]"
+    cmd = ["ffmpeg","-y","-v","error","-f","lavfi","-i",f"testsrc2=size={size}:rate={fps}","-f","lavfi","-i","sine=frequency=440:sample_rate=48000",
+           "-filter_complex",audio,"-map","0:v","-map","[a]","-t",str(duration),"-c:v","libx264","-preset","ultrafast","-g",str(gop),"-pix_fmt","yuv420p","-c:a","aac","-b:a","128k",path]
+    subprocess.run(cmd, check=True)
+    return path
+
+def ensure_clip(media_dir, duration, size, gop, **kw):
+    os.makedirs(media_dir, exist_ok=True)
+    path = os.path.join(media_dir, media_name(duration, size, gop, kw.get("speech_period", 6.0), kw.get("speech_on", 3.0)))
+    if not os.path.exists(path):
+        tmp = path + ".part.mp4"
+        make_synthetic_clip(tmp, duration, size, gop, **kw)
+        os.replace(tmp, path)
+    return path
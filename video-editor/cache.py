@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import shutil
+import threading
+from analyzer import save_analysis, load_analysis
+from media import file_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".weddingcut", "cache")
+
+class AnalysisCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2*1024**3, suffix=".json"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(e[2] for e in self._entries())
+
+    def key(self, video_path, stage, params=None):
+        payload = json.dumps([file_fingerprint(video_path), stage, params or {}], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(self.suffix):
+                    p = os.path.join(root, name)
+                    try:
+                        st = os.stat(p)
+                        yield p, st.st_mtime, st.st_size
+                    except OSError:
+                        pass
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, video_path, stage, params=None):
+        p = self.path_for(self.key(video_path, stage, params))
+        try:
+            data = load_analysis(p)
+            os.utime(p)
+        except (OSError, ValueError):
+            self._count(False)
+            return None
+        self._count(True)
+        return data.get("value")
+
+    def store(self, video_path, stage, params, value):
+        p = self.path_for(self.key(video_path, stage, params))
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = f"{p}.{threading.get_ident()}.tmp"
+        save_analysis({"stage": stage, "params": params, "value": value}, tmp)
+        old = os.path.getsize(p) if os.path.exists(p) else 0
+        os.replace(tmp, p)
+        with self._lock:
+            self._size += os.path.getsize(p) - old
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(e[2] for e in entries)
+            for p, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(p)
+                    total -= size
+                except OSError:
+                    pass
+            self._size = total
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+DEFAULT_RENDER_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".weddingcut", "render")
+
+class RenderCache(AnalysisCache):
+    def __init__(self, cache_dir=DEFAULT_RENDER_CACHE_DIR, max_bytes=20*1024**3):
+        super().__init__(cache_dir, max_bytes, suffix=".seg")
+
+    def lookup_file(self, video_path, params):
+        p = self.path_for(self.key(video_path, "render", params))
+        if not os.path.exists(p):
+            self._count(False)
+            return None
+        try:
+            os.utime(p)
+        except OSError:
+            pass
+        self._count(True)
+        return p
+
+    def store_file(self, video_path, params, src_file, evict=False):
+        p = self.path_for(self.key(video_path, "render", params))
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = f"{p}.{threading.get_ident()}.tmp"
+        shutil.move(src_file, tmp)
+        os.replace(tmp, p)
+        with self._lock:
+            self._size += os.path.getsize(p)
+        if evict and self._size > self.max_bytes:
+            self.evict()
+        return p
@@ -0,0 +1,194 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from analyzer import analyze_project_beats, save_analysis
+from scheduler import analyze_clips, StageLimiter
+from timeline import BeatGrid, auto_cut_timeline, sync_to_beats, timeline_stats
+from exporter import render_video, export_fcpxml, export_edl, export_csv, export_transcript
+from cache import AnalysisCache, RenderCache
+from proxy import ProxyManager, render_draft
+from pipeline import run_pipeline
+import tracing
+
+VIDEO_EXTS = (".mp4",".mov",".avi",".mkv",".mts",".m2ts",".wmv",".webm")
+EXPORTS = {"video": "finale.mp4", "video_smart": "finale.mp4", "draft": "bozza.mp4", "fcpxml": "timeline.fcpxml", "edl": "timeline.edl", "csv": "tagli.csv", "transcript": "trascrizione.txt"}
+DEFAULT_OPTIONS = {"analysis": {}, "cut": {"remove_silences": True, "remove_fillers": True, "min_segment_duration": 0.3, "padding_seconds": 0.05}, "render": {}, "music_file": None, "sync_beats": False, "pipeline": False, "frame_rate": None, "exports": ["fcpxml"]}
+
+_print_lock = threading.Lock()
+
+def load_options(path):
+    opts = json.loads(json.dumps(DEFAULT_OPTIONS))
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            user = json.load(f)
+        for k, v in user.items():
+            if isinstance(v, dict) and isinstance(opts.get(k), dict):
+                opts[k].update(v)
+            else:
+                opts[k] = v
+    return opts
+
+def collect_videos(spec):
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, n) for n in os.listdir(spec)]
+    else:
+        paths = glob.glob(spec)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTS))
+
+def project_name(spec):
+    base = spec.rstrip("/\\") if os.path.isdir(spec) else os.path.dirname(spec) or "."
+    return os.path.basename(os.path.abspath(base)) or "progetto"
+
+class ProjectLog:
+    def __init__(self, name, path, quiet=False):
+        self.name = name
+        self.quiet = quiet
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, msg):
+        line = f"{time.strftime('%H:%M:%S')} {msg}"
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+        if not self.quiet:
+            with _print_lock:
+                print(f"[{self.name}] {msg}", flush=True)
+
+    def close(self):
+        self._f.close()
+
+def run_project(spec, out_root, opts, limiter, cache, render_cache, quiet=False):
+    name = project_name(spec)
+    out_dir = os.path.join(out_root, name)
+    os.makedirs(out_dir, exist_ok=True)
+    log = ProjectLog(name, os.path.join(out_dir, "log.txt"), quiet)
+    failed = False
+    proxies = None
+    try:
+        videos = collect_videos(spec)
+        if not videos:
+            log(f"ERRORE: nessun video trovato in {spec}")
+            return False
+        log(f"Analisi di {len(videos)} file...")
+        beat_times = []
+        if opts.get("sync_beats") and opts.get("music_file"):
+            beat_times = analyze_project_beats(opts["music_file"], cache)
+            log(f"{len(beat_times)} beat rilevati")
+        def finished(done, i, path, result, err):
+            nonlocal failed
+            fname = os.path.basename(path)
+            if err is not None:
+                failed = True
+                log(f"[{done}/{len(videos)}] ERRORE {fname}: {err}")
+                return
+            log(f"[{done}/{len(videos)}] {fname}: {len(result.get('silences',[]))} silenzi, {len(result.get('filler_segments',[]))} filler, {len(result.get('best_scenes',[]))} scene top")
+            for e in result.get("errors", []):
+                failed = True
+                log(f"  ATTENZIONE {fname}: {e}")
+        progress = lambda p, m: p % 20 == 0 and log(f"  {p}% {m}")
+        render_opts = opts.get("render", {})
+        stream = opts.get("pipeline") and render_opts.get("engine", "segments") == "segments" and next((f for f in opts.get("exports") or [] if f in ("video", "video_smart")), None)
+        if stream:
+            out = os.path.join(out_dir, EXPORTS[stream])
+            log(f"Analisi ed esportazione {stream} in parallelo: {out}")
+            analyses, segs = run_pipeline(videos, out, opts["analysis"], opts["cut"], beat_times, {k: v for k, v in render_opts.items() if k != "engine"}, progress, finished, cache, render_cache, limiter, smart_render=stream == "video_smart")
+        else:
+            analyses = [r for r in analyze_clips(videos, opts["analysis"], on_done=finished, cache=cache, limiter=limiter) if r is not None]
+        save_analysis(analyses, os.path.join(out_dir, "analysis.npz"))
+        if "draft" in (opts.get("exports") or []):
+            proxies = ProxyManager()
+            proxy_jobs = proxies.submit(videos, lambda path, proxy, err: err is not None and log(f"  ATTENZIONE proxy {os.path.basename(path)}: {err}"))
+            log(f"Proxy: {len(proxy_jobs)} da generare")
+        if not stream:
+            segs = auto_cut_timeline(analyses, opts["cut"])
+            if beat_times:
+                segs = sync_to_beats(segs, BeatGrid(beat_times))
+        st = timeline_stats(segs)
+        log(f"Timeline: {st['n_segments']} segmenti, {st['total_duration']:.2f}s")
+        if not segs:
+            log("ERRORE: timeline vuota, niente da esportare")
+            return False
+        for fmt in opts.get("exports") or []:
+            if fmt == stream:
+                continue
+            out = os.path.join(out_dir, EXPORTS[fmt])
+            log(f"Esporto {fmt}: {out}")
+            if fmt in ("video", "video_smart"):
+                render_video(segs, out, progress_callback=progress, smart_render=fmt == "video_smart", cache=render_cache, **render_opts)
+            elif fmt == "draft":
+                for f in proxy_jobs:
+                    f.result()
+                render_draft(segs, out, proxies, progress_callback=progress)
+            elif fmt == "fcpxml":
+                export_fcpxml(segs, out, project_name=name, frame_rate=opts.get("frame_rate"))
+            elif fmt == "edl":
+                export_edl(segs, out, project_name=name, frame_rate=opts.get("frame_rate"))
+            elif fmt == "csv":
+                export_csv(segs, out)
+            elif fmt == "transcript":
+                export_transcript(analyses, out)
+        log("Completato" if not failed else "Completato con errori")
+        return not failed
+    except Exception as e:
+        log(f"ERRORE: {e}")
+        return False
+    finally:
+        if proxies is not None:
+            proxies.shutdown()
+        log.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="weddingcut", description="WeddingCut Pro senza interfaccia: analisi, auto-cut ed esportazione di una o più cartelle di girato")
+    ap.add_argument("projects", nargs="+", help="cartella o glob di video; ognuno è un progetto separato")
+    ap.add_argument("-o", "--options", help="file JSON con le opzioni (sezioni analysis, cut, render, exports...)")
+    ap.add_argument("-d", "--out", default="weddingcut_output", help="cartella di output")
+    ap.add_argument("-j", "--jobs", type=int, default=2, help="progetti elaborati in parallelo")
+    ap.add_argument("-e", "--export", help="formati separati da virgola: " + ",".join(EXPORTS))
+    ap.add_argument("--music", help="file musica per la sincronizzazione ai beat")
+    ap.add_argument("--pipeline", action="store_true", help="inizia a codificare il video mentre le altre clip sono ancora in analisi")
+    ap.add_argument("--no-cache", action="store_true", help="non usare la cache di analisi e di render")
+    ap.add_argument("--trace", metavar="FILE", help="salva i tempi di ogni fase in formato Chrome trace (JSON) e stampa il riepilogo")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    args = ap.parse_args(argv)
+    try:
+        opts = load_options(args.options)
+    except (OSError, ValueError) as e:
+        ap.error(f"opzioni non valide: {e}")
+    if args.export:
+        opts["exports"] = [f.strip() for f in args.export.split(",") if f.strip()]
+    if args.pipeline:
+        opts["pipeline"] = True
+    if args.music:
+        opts["music_file"] = args.music
+        opts["sync_beats"] = True
+    unknown = [f for f in opts.get("exports") or [] if f not in EXPORTS]
+    if unknown:
+        ap.error(f"formati sconosciuti: {', '.join(unknown)}")
+    cache = render_cache = None
+    if not args.no_cache:
+        cache, render_cache = AnalysisCache(), RenderCache()
+    limiter = StageLimiter(opts.get("stage_limits"))
+    tracer = tracing.enable() if args.trace else None
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = list(pool.map(lambda spec: run_project(spec, args.out, opts, limiter, cache, render_cache, args.quiet), args.projects))
+    if tracer is not None:
+        tracing.disable(tracer)
+        print("Tempi per fase:\n" + tracer.format_summary())
+        print(f"Trace salvato in {tracer.dump_chrome(args.trace)}")
+    if cache is not None:
+        st = cache.stats()
+        print(f"Cache analisi: {st['hits']} hit, {st['misses']} miss")
+    failed = [spec for spec, ok in zip(args.projects, results) if not ok]
+    for spec in failed:
+        print(f"FALLITO: {spec}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
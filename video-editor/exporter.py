@@ -1,89 +1,418 @@
 import os
 import subprocess
-import json
 import tempfile
 import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from timeline import Segment, format_timeline_for_display
+from media import get_registry
+import tracing
 
 def get_file_duration_ffprobe(video_path):
-    cmd = ["ffprobe","-v","quiet","-print_format","json","-show_format",video_path]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        data = json.loads(result.stdout)
-        return float(data.get("format",{}).get("duration",0))
+        return float(get_registry().get(video_path).get("duration",0))
     except Exception:
         return 0.0
 
-def render_video(segments, output_path, progress_callback=None, video_codec="libx264", audio_codec="aac", crf=18, resolution=None):
+class EncodePool:
+    def __init__(self, max_workers=None, threads_per_job=None):
+        cpu = os.cpu_count() or 2
+        self.threads_per_job = threads_per_job or (2 if cpu >= 4 else 1)
+        self.max_workers = max_workers or max(1, cpu // self.threads_per_job)
+        self.cancelled = threading.Event()
+        self._procs = set()
+        self._lock = threading.Lock()
+
+    def run_ffmpeg(self, cmd):
+        with tempfile.TemporaryFile() as err, tracing.subprocess_span(cmd) as sp:
+            with self._lock:
+                if self.cancelled.is_set():
+                    raise RuntimeError("Esportazione annullata")
+                proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=err)
+                self._procs.add(proc)
+            try:
+                returncode = proc.wait()
+            finally:
+                with self._lock:
+                    self._procs.discard(proc)
+            sp.set(exit_code=returncode, bytes_out=tracing.output_bytes(cmd[-1]) if returncode == 0 else 0)
+            if returncode != 0:
+                if self.cancelled.is_set():
+                    raise RuntimeError("Esportazione annullata")
+                err.seek(0)
+                raise RuntimeError(err.read().decode("utf-8", "replace")[-300:])
+
+    def abort(self):
+        with self._lock:
+            self.cancelled.set()
+            for proc in self._procs:
+                try: proc.kill()
+                except OSError: pass
+
+    def run(self, jobs, on_done=None):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            futures = {ex.submit(job): i for i, job in enumerate(jobs)}
+            done = 0
+            try:
+                for f in as_completed(futures):
+                    f.result()
+                    done += 1
+                    if on_done:
+                        on_done(done, len(jobs))
+            except BaseException:
+                self.abort()
+                for f in futures:
+                    f.cancel()
+                raise
+
+def _segment_cmd(seg, seg_output, video_codec, audio_codec, crf, resolution, threads, preset="fast"):
+    vf = ["-vf", f"scale={resolution.replace('x',':')}:force_original_aspect_ratio=decrease"] if resolution else []
+    return ["ffmpeg","-y","-ss",str(seg.start),"-i",seg.video_path,"-t",str(seg.duration)] + vf + ["-c:v",video_codec,"-crf",str(crf),"-preset",preset,"-threads",str(threads),"-c:a",audio_codec,"-b:a","192k","-avoid_negative_ts","1",seg_output]
+
+SMART_CODECS = {"libx264": "h264", "libx265": "hevc"}
+SMART_MIN_COPY = 1.0
+X264_PROFILES = {"constrained baseline": "baseline", "baseline": "baseline", "main": "main", "high": "high", "high 10": "high10", "high 4:2:2": "high422", "high 4:4:4 predictive": "high444"}
+
+def probe_keyframes(video_path, start_time=0.0):
+    cmd = ["ffprobe","-v","error","-select_streams","v:0","-show_entries","packet=pts_time,flags","-of","csv=p=0",video_path]
+    result = tracing.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return []
+    keyframes = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) >= 2 and "K" in parts[1] and parts[0] not in ("", "N/A"):
+            keyframes.append(round(float(parts[0]) - start_time, 6))
+    keyframes.sort()
+    return keyframes
+
+def smart_encode_params(media, video_codec, resolution=None):
+    if not media or SMART_CODECS.get(video_codec) != media.get("codec"):
+        return None
+    if resolution and resolution != f"{media.get('width')}x{media.get('height')}":
+        return None
+    params = ["-c:v", video_codec, "-pix_fmt", media.get("pix_fmt") or "yuv420p"]
+    profile = X264_PROFILES.get(str(media.get("profile","")).lower())
+    if profile and video_codec == "libx264":
+        params += ["-profile:v", profile]
+    if media.get("r_frame_rate") not in (None, "", "0/0"):
+        params += ["-r", media["r_frame_rate"]]
+    return params
+
+def smart_pieces(seg, keyframes):
+    k1 = next((k for k in keyframes if k >= seg.start), None)
+    k2 = next((k for k in reversed(keyframes) if k <= seg.end), None)
+    if k1 is None or k2 is None or k2 - k1 < SMART_MIN_COPY:
+        return [("encode", seg.start, seg.end)]
+    pieces = []
+    if k1 - seg.start > 0.001:
+        pieces.append(("encode", seg.start, k1))
+    pieces.append(("copy", k1, k2))
+    if seg.end - k2 > 0.001:
+        pieces.append(("encode", k2, seg.end))
+    return pieces
+
+def _smart_piece_cmd(kind, src, start, end, out, enc_params, audio_codec, crf, threads):
+    head = ["ffmpeg","-y","-ss",str(start),"-i",src,"-t",str(end-start),"-map","0:v:0","-map","0:a:0?"]
+    if kind == "copy":
+        video = ["-c:v","copy"]
+    else:
+        video = enc_params + ["-crf",str(crf),"-preset","fast","-threads",str(threads)]
+    return head + video + ["-c:a",audio_codec,"-b:a","192k","-f","mpegts",out]
+
+class SegmentRenderer:
+    def __init__(self, output_path, video_codec="libx264", audio_codec="aac", crf=18, resolution=None, max_workers=None, threads_per_job=None, smart_render=False, cache=None, preset="fast", on_job_done=None):
+        self.output_path = output_path
+        self.video_codec, self.audio_codec, self.crf, self.resolution, self.preset = video_codec, audio_codec, crf, resolution, preset
+        self.smart_render = smart_render
+        self.cache = cache
+        self.on_job_done = on_job_done
+        self.pool = EncodePool(max_workers, threads_per_job)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.n_segments = self.n_jobs = self.n_done = self.copied = self.reused = 0
+        self._ex = ThreadPoolExecutor(max_workers=self.pool.max_workers)
+        self._futures = []
+        self._files = []
+        self._slots = {}
+        self._temp_files = []
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._base_key = {"video_codec": video_codec, "audio_codec": audio_codec, "crf": crf, "resolution": resolution, "preset": preset}
+
+    def _smart_sources(self, segments):
+        registry = get_registry()
+        new = [seg.video_path for seg in segments if seg.video_path not in self._sources]
+        if not new:
+            return
+        for path, media in registry.probe_many(new).items():
+            params = smart_encode_params(media, self.video_codec, self.resolution)
+            keyframes = media.get("keyframes") if params else []
+            if keyframes is None:
+                keyframes = probe_keyframes(path, media.get("start_time", 0.0))
+                if keyframes:
+                    registry.update(path, keyframes=keyframes)
+            self._sources[path] = (params, keyframes)
+        registry.save()
+
+    def _jobs(self, segments):
+        jobs = []
+        threads = self.pool.threads_per_job
+        if self.smart_render:
+            self._smart_sources(segments)
+            for i, seg in enumerate(segments, start=self.n_segments):
+                params, keyframes = self._sources[seg.video_path]
+                if params is None:
+                    pieces = [("encode", seg.start, seg.end)]
+                else:
+                    pieces = smart_pieces(seg, keyframes)
+                for p, (kind, a, b) in enumerate(pieces):
+                    out = os.path.join(self.tmp_dir, f"seg_{i:04d}_{p}.ts")
+                    if params is None:
+                        cmd = _segment_cmd(Segment(seg.video_path, a, b), out, self.video_codec, self.audio_codec, self.crf, self.resolution, threads, self.preset)
+                        cmd[-1:-1] = ["-f","mpegts"]
+                    else:
+                        cmd = _smart_piece_cmd(kind, seg.video_path, a, b, out, params, self.audio_codec, self.crf, threads)
+                    self.copied += kind == "copy"
+                    key = dict(self._base_key, kind=kind, start=a, end=b, container="ts", smart=params)
+                    jobs.append({"index": i, "src": seg.video_path, "cmd": cmd, "out": out, "key": key})
+        else:
+            for i, seg in enumerate(segments, start=self.n_segments):
+                out = os.path.join(self.tmp_dir, f"seg_{i:04d}.mp4")
+                key = dict(self._base_key, kind="encode", start=seg.start, end=seg.end, container="mp4")
+                jobs.append({"index": i, "src": seg.video_path, "cmd": _segment_cmd(seg, out, self.video_codec, self.audio_codec, self.crf, self.resolution, threads, self.preset), "out": out, "key": key})
+        self.n_segments += len(segments)
+        return jobs
+
+    def submit(self, segments, slot=None):
+        jobs = self._jobs(segments)
+        slot = len(self._slots) if slot is None else slot
+        todo = []
+        for job in jobs:
+            n = len(self._files)
+            self._files.append(job["out"])
+            self._temp_files.append(job["out"])
+            self._slots.setdefault(slot, []).append(n)
+            hit = self.cache.lookup_file(job["src"], job["key"]) if self.cache is not None else None
+            if hit:
+                self._files[n] = hit
+                self.reused += 1
+            else:
+                todo.append((n, job))
+        with self._lock:
+            self.n_jobs += len(todo)
+        self._futures += [self._ex.submit(self._encode, n, job) for n, job in todo]
+        return len(jobs)
+
+    def _encode(self, n, job):
+        with tracing.span("segment", "render", clip=os.path.basename(job["src"]), index=job["index"], kind=job["key"]["kind"]):
+            try:
+                self.pool.run_ffmpeg(job["cmd"])
+            except RuntimeError as e:
+                self.pool.abort()
+                raise RuntimeError(f"FFmpeg errore segmento {job['index']}: {e}") from None
+            if self.cache is not None:
+                self._files[n] = self.cache.store_file(job["src"], job["key"], job["out"])
+        with self._lock:
+            self.n_done += 1
+            done, total = self.n_done, self.n_jobs
+        if self.on_job_done:
+            self.on_job_done(done, total)
+
+    def wait(self):
+        try:
+            for f in as_completed(list(self._futures)):
+                f.result()
+        except BaseException:
+            self.abort()
+            raise
+
+    def concat(self):
+        concat_list = os.path.join(self.tmp_dir, "concat.txt")
+        self._temp_files.append(concat_list)
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for slot in sorted(self._slots):
+                for n in self._slots[slot]:
+                    f.write(f"file '{self._files[n].replace(chr(92),'/')}'\n")
+        cmd_concat = ["ffmpeg","-y","-f","concat","-safe","0","-i",concat_list,"-c","copy"]
+        if self.smart_render and self.audio_codec == "aac":
+            cmd_concat += ["-bsf:a","aac_adtstoasc"]
+        result = tracing.run(cmd_concat + [self.output_path], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg errore concat: {result.stderr[-300:]}")
+
+    def abort(self):
+        self.pool.abort()
+        for f in self._futures:
+            f.cancel()
+
+    def close(self):
+        self._ex.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.evict()
+        for sf in self._temp_files:
+            try: os.remove(sf)
+            except: pass
+        try: os.rmdir(self.tmp_dir)
+        except: pass
+
+def render_video(segments, output_path, progress_callback=None, video_codec="libx264", audio_codec="aac", crf=18, resolution=None, max_workers=None, threads_per_job=None, smart_render=False, engine="segments", cache=None, preset="fast"):
+    if engine == "filtergraph":
+        if smart_render:
+            raise ValueError("Il motore filtergraph non supporta il rendering rapido (smart render)")
+        if cache is not None and progress_callback:
+            progress_callback(0, "Cache di render non usata dal motore filtergraph")
+        return render_video_filtergraph(segments, output_path, progress_callback, video_codec, audio_codec, crf, resolution, max_workers, threads_per_job, preset=preset)
+    if not segments:
+        raise ValueError("Nessun segmento da esportare")
+    def done(n, total):
+        if progress_callback:
+            progress_callback(int((n/total)*60), f"Segmenti completati {n}/{total}...")
+    renderer = SegmentRenderer(output_path, video_codec, audio_codec, crf, resolution, max_workers, threads_per_job, smart_render, cache, preset, done)
+    try:
+        if smart_render and progress_callback:
+            progress_callback(0, "Analizzo i keyframe delle sorgenti...")
+        n_jobs = renderer.submit(segments)
+        if progress_callback:
+            extra = f", {renderer.copied} parti in copia diretta" if smart_render else ""
+            if cache is not None:
+                extra += f", {renderer.reused}/{n_jobs} riutilizzati dalla cache"
+            progress_callback(0, f"Taglio {len(segments)} segmenti ({renderer.pool.max_workers} in parallelo{extra})...")
+        renderer.wait()
+        if progress_callback:
+            progress_callback(65, "Unisco i segmenti...")
+            progress_callback(70, "Rendering finale...")
+        renderer.concat()
+        if progress_callback:
+            progress_callback(100, "Esportazione completata!" if cache is None else f"Esportazione completata! Riutilizzati {renderer.reused}/{n_jobs} segmenti")
+        return True
+    finally:
+        renderer.close()
+
+FILTERGRAPH_MAX_INPUTS = 32
+
+def _filtergraph_script(segments, width, height, has_audio=None):
+    norm = f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p"
+    lines = []
+    for k, seg in enumerate(segments):
+        lines.append(f"[{k}:v:0]trim=duration={seg.duration:.6f},setpts=PTS-STARTPTS,{norm}[v{k}];")
+        if has_audio is None or has_audio[k]:
+            lines.append(f"[{k}:a:0]atrim=duration={seg.duration:.6f},asetpts=PTS-STARTPTS,aresample=48000[a{k}];")
+        else:
+            lines.append(f"anullsrc=r=48000:cl=stereo,atrim=duration={seg.duration:.6f}[a{k}];")
+    lines.append("".join(f"[v{k}][a{k}]" for k in range(len(segments))) + f"concat=n={len(segments)}:v=1:a=1[outv][outa]")
+    return "\n".join(lines)
+
+def _filtergraph_cmd(segments, script_path, output_path, video_codec, audio_codec, crf, threads, preset="fast"):
+    cmd = ["ffmpeg","-y"]
+    for seg in segments:
+        cmd += ["-ss",str(seg.start),"-t",str(seg.duration),"-i",seg.video_path]
+    return cmd + ["-filter_complex_script",script_path,"-map","[outv]","-map","[outa]","-c:v",video_codec,"-crf",str(crf),"-preset",preset,"-threads",str(threads),"-c:a",audio_codec,"-b:a","192k",output_path]
+
+def render_video_filtergraph(segments, output_path, progress_callback=None, video_codec="libx264", audio_codec="aac", crf=18, resolution=None, max_workers=None, threads_per_job=None, max_inputs=FILTERGRAPH_MAX_INPUTS, preset="fast"):
     if not segments:
         raise ValueError("Nessun segmento da esportare")
-    total_segs = len(segments)
+    registry = get_registry()
+    sources = registry.probe_many(seg.video_path for seg in segments)
+    registry.save()
+    if resolution:
+        width, height = resolution.split("x")
+    else:
+        media = sources[segments[0].video_path]
+        width, height = media.get("width") or 1920, media.get("height") or 1080
+    has_audio = [sources[seg.video_path].get("has_audio", True) for seg in segments]
+    chunks = [segments[i:i+max_inputs] for i in range(0, len(segments), max_inputs)]
     tmp_dir = tempfile.mkdtemp()
-    segment_files = []
+    scripts = [os.path.join(tmp_dir, f"graph_{c:03d}.txt") for c in range(len(chunks))]
+    parts = [output_path] if len(chunks) == 1 else [os.path.join(tmp_dir, f"part_{c:03d}.mp4") for c in range(len(chunks))]
     concat_list = os.path.join(tmp_dir, "concat.txt")
+    cpu = os.cpu_count() or 2
+    workers = max_workers or min(len(chunks), max(1, cpu // 4))
+    pool = EncodePool(workers, threads_per_job or max(1, cpu // workers))
+    def encode(c):
+        with tracing.span("chunk", "render", index=c, segments=len(chunks[c])):
+            with open(scripts[c], "w", encoding="utf-8") as f:
+                f.write(_filtergraph_script(chunks[c], width, height, has_audio[c*max_inputs:(c+1)*max_inputs]))
+            try:
+                pool.run_ffmpeg(_filtergraph_cmd(chunks[c], scripts[c], parts[c], video_codec, audio_codec, crf, pool.threads_per_job, preset))
+            except RuntimeError as e:
+                raise RuntimeError(f"FFmpeg errore blocco {c}: {e}") from None
+    def done(n, total):
+        if progress_callback:
+            progress_callback(int((n/total)*90), f"Blocchi completati {n}/{total}...")
     try:
-        for i, seg in enumerate(segments):
+        if progress_callback:
+            progress_callback(0, f"Rendering in un passaggio: {len(segments)} segmenti in {len(chunks)} blocchi...")
+        pool.run([lambda c=c: encode(c) for c in range(len(chunks))], done)
+        if len(chunks) > 1:
             if progress_callback:
-                progress_callback(int((i/total_segs)*60), f"Taglio segmento {i+1}/{total_segs}...")
-            seg_output = os.path.join(tmp_dir, f"seg_{i:04d}.mp4")
-            vf = ["-vf", f"scale={resolution.replace('x',':')}:force_original_aspect_ratio=decrease"] if resolution else []
-            cmd = ["ffmpeg","-y","-ss",str(seg.start),"-i",seg.video_path,"-t",str(seg.duration)] + vf + ["-c:v",video_codec,"-crf",str(crf),"-preset","fast","-c:a",audio_codec,"-b:a","192k","-avoid_negative_ts","1",seg_output]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+                progress_callback(92, "Unisco i blocchi...")
+            with open(concat_list, "w", encoding="utf-8") as f:
+                for p in parts:
+                    f.write(f"file '{p.replace(chr(92),'/')}'\n")
+            result = tracing.run(["ffmpeg","-y","-f","concat","-safe","0","-i",concat_list,"-c","copy",output_path], capture_output=True, text=True)
             if result.returncode != 0:
-                raise RuntimeError(f"FFmpeg errore segmento {i}: {result.stderr[-300:]}")
-            segment_files.append(seg_output)
-        if progress_callback:
-            progress_callback(65, "Unisco i segmenti...")
-        with open(concat_list, "w", encoding="utf-8") as f:
-            for sf in segment_files:
-                f.write(f"file '{sf.replace(chr(92),'/')}'\n")
-        if progress_callback:
-            progress_callback(70, "Rendering finale...")
-        cmd_concat = ["ffmpeg","-y","-f","concat","-safe","0","-i",concat_list,"-c","copy",output_path]
-        result = subprocess.run(cmd_concat, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg errore concat: {result.stderr[-300:]}")
+                raise RuntimeError(f"FFmpeg errore concat: {result.stderr[-300:]}")
         if progress_callback:
             progress_callback(100, "Esportazione completata!")
         return True
     finally:
-        for sf in segment_files:
-            try: os.remove(sf)
+        for p in scripts + (parts if len(chunks) > 1 else []) + [concat_list]:
+            try: os.remove(p)
             except: pass
-        try: os.remove(concat_list)
-        except: pass
         try: os.rmdir(tmp_dir)
         except: pass
 
-def export_fcpxml(segments, output_path, project_name="WeddingCut", frame_rate="25"):
-    fr = int(frame_rate)
-    total_frames = int(sum(s.duration for s in segments) * fr)
+def fcpxml_rate(fps):
+    fps = float(fps)
+    n = int(round(fps))
+    if n in (24, 30, 60) and abs(fps - n*1000/1001) < 0.01:
+        return 1001, n*1000
+    return 1, n
+
+def _project_media(segments):
+    registry = get_registry()
+    media = registry.probe_many(seg.video_path for seg in segments)
+    registry.save()
+    return media
+
+def export_fcpxml(segments, output_path, project_name="WeddingCut", frame_rate=None):
+    media = _project_media(segments)
+    first = media[segments[0].video_path] if segments else {}
+    num, den = fcpxml_rate(frame_rate or first.get("fps") or 25)
+    fps = den / num
+    width, height = first.get("width") or 1920, first.get("height") or 1080
+    t = lambda frames: f"{frames*num}/{den}s"
+    total_frames = int(sum(s.duration for s in segments) * fps)
     unique_files = {}
     asset_id = 2
-    lines = ['<?xml version="1.0" encoding="UTF-8"?>','<!DOCTYPE fcpxml>','<fcpxml version="1.9">','  <resources>',f'    <format id="r1" name="FFVideoFormat{frame_rate}p" frameDuration="1/{fr}s" width="1920" height="1080"/>']
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>','<!DOCTYPE fcpxml>','<fcpxml version="1.9">','  <resources>',f'    <format id="r1" name="FFVideoFormat{height}p{round(fps*100) if num > 1 else den}" frameDuration="{num}/{den}s" width="{width}" height="{height}"/>']
     for seg in segments:
         if seg.video_path not in unique_files:
             uid = f"r{asset_id}"
             unique_files[seg.video_path] = uid
             name = os.path.basename(seg.video_path)
             url = "file:///" + seg.video_path.replace("\\","/").replace(" ","%20")
-            dur = int(get_file_duration_ffprobe(seg.video_path) * fr)
-            lines += [f'    <asset id="{uid}" name="{name}" start="0s" duration="{dur}/{fr}s" hasVideo="1" hasAudio="1" format="r1">',f'      <media-rep kind="original-media" src="{url}"/>','    </asset>']
+            info = media[seg.video_path]
+            dur = int(info.get("duration",0) * fps)
+            lines += [f'    <asset id="{uid}" name="{name}" start="0s" duration="{t(dur)}" hasVideo="1" hasAudio="{1 if info.get("has_audio", True) else 0}" format="r1">',f'      <media-rep kind="original-media" src="{url}"/>','    </asset>']
             asset_id += 1
-    lines += ['  </resources>','  <library>',f'    <event name="{project_name}">',f'      <project name="{project_name}">',f'        <sequence duration="{total_frames}/{fr}s" format="r1" tcStart="0s" tcFormat="NDF" audioLayout="stereo" audioRate="48k">','          <spine>']
+    lines += ['  </resources>','  <library>',f'    <event name="{project_name}">',f'      <project name="{project_name}">',f'        <sequence duration="{t(total_frames)}" format="r1" tcStart="0s" tcFormat="NDF" audioLayout="stereo" audioRate="48k">','          <spine>']
     offset = 0
     for seg in segments:
         ref = unique_files[seg.video_path]
-        sf = int(round(seg.start * fr))
-        df = int(round(seg.duration * fr))
-        lines.append(f'            <asset-clip ref="{ref}" name="{os.path.basename(seg.video_path)}" offset="{offset}/{fr}s" start="{sf}/{fr}s" duration="{df}/{fr}s" format="r1" audioRole="dialogue"/>')
+        sf = int(round(seg.start * fps))
+        df = int(round(seg.duration * fps))
+        lines.append(f'            <asset-clip ref="{ref}" name="{os.path.basename(seg.video_path)}" offset="{t(offset)}" start="{t(sf)}" duration="{t(df)}" format="r1" audioRole="dialogue"/>')
         offset += df
     lines += ['          </spine>','        </sequence>','      </project>','    </event>','  </library>','</fcpxml>']
     with open(output_path,"w",encoding="utf-8") as f:
         f.write("\n".join(lines))
     return True
 
-def export_edl(segments, output_path, project_name="WeddingCut", frame_rate=25):
+def export_edl(segments, output_path, project_name="WeddingCut", frame_rate=None):
+    if not frame_rate:
+        first = _project_media(segments[:1]).get(segments[0].video_path, {}) if segments else {}
+        frame_rate = int(round(first.get("fps") or 25))
     def tc(secs):
         tf = int(round(secs * frame_rate))
         return f"{tf//3600//frame_rate:02d}:{(tf//frame_rate%3600)//60:02d}:{tf//frame_rate%60:02d}:{tf%frame_rate:02d}"
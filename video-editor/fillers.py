@@ -0,0 +1,98 @@
+import os
+import re
+import json
+import functools
+
+FILLER_WORDS_IT = ["ehm","ehmm","uh","uhh","ah","ahh","allora","tipo","cioè","praticamente","diciamo","insomma","ecco","dunque","vabbè","boh","mah"]
+FILLER_WORDS_EN = ["um","uh","uhh","er","ah","like","you know","basically","literally","actually","so","right","i mean","well"]
+FILLER_WORDS_FR = ["euh","heu","bah","ben","genre","en fait","du coup","tu vois","tu sais","voilà","bref"]
+FILLER_WORDS_ES = ["eh","ehm","em","este","pues","bueno","o sea","en plan","digamos","sabes","vale"]
+FILLER_WORDS = {"it": FILLER_WORDS_IT, "en": FILLER_WORDS_EN, "fr": FILLER_WORDS_FR, "es": FILLER_WORDS_ES}
+DEFAULT_USER_FILLERS = os.path.join(os.path.expanduser("~"), ".weddingcut", "fillers.json")
+
+_PUNCT = re.compile(r"[^\w']+")
+_ELONGATION = re.compile(r"(\w)\1{2,}")
+
+def normalize_token(word):
+    return _ELONGATION.sub(r"\1", _PUNCT.sub("", word.lower().replace("’", "'")))
+
+def tokenize(phrase):
+    return [t for t in (normalize_token(w) for w in phrase.split()) if t]
+
+class FillerMatcher:
+    def __init__(self, phrases):
+        self.trie = {}
+        self.max_len = 0
+        for phrase in phrases:
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            node = self.trie
+            for t in tokens:
+                node = node.setdefault(t, {})
+            node[None] = phrase
+            self.max_len = max(self.max_len, len(tokens))
+
+    def match(self, tokens):
+        i, n = 0, len(tokens)
+        while i < n:
+            node, end = self.trie, None
+            for j in range(i, min(n, i + self.max_len)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    end = j + 1
+            if end is None:
+                i += 1
+            else:
+                yield i, end
+                i = end
+
+def load_user_fillers(path=DEFAULT_USER_FILLERS):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {lang: list(words) for lang, words in data.items() if isinstance(words, list)}
+
+def _user_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+@functools.lru_cache(maxsize=32)
+def _compiled(language, extra, user_path, user_mtime):
+    phrases = list(FILLER_WORDS.get(language, FILLER_WORDS_EN))
+    if user_mtime is not None:
+        phrases += load_user_fillers(user_path).get(language, [])
+    return FillerMatcher(phrases + list(extra))
+
+def get_matcher(language="it", extra=(), user_path=DEFAULT_USER_FILLERS):
+    return _compiled(language, tuple(extra or ()), user_path, _user_mtime(user_path))
+
+def detect_fillers(transcription, language="it", extra=(), user_path=DEFAULT_USER_FILLERS):
+    matcher = get_matcher(language, extra, user_path)
+    words, owners = [], []
+    for seg in transcription.get("segments", []):
+        seg["fillers"] = []
+        for w in seg.get("words", []):
+            words.append(w)
+            owners.append(seg)
+    tokens = [normalize_token(w["word"]) for w in words]
+    keep = [k for k, t in enumerate(tokens) if t]
+    fillers = []
+    for i, j in matcher.match([tokens[k] for k in keep]):
+        hit = [keep[k] for k in range(i, j)]
+        fillers.append({"start": words[hit[0]]["start"], "end": words[hit[-1]]["end"], "word": " ".join(words[k]["word"] for k in hit), "type": "filler"})
+        for k in hit:
+            owners[k]["fillers"].append(words[k])
+    transcription["filler_segments"] = fillers
+    return fillers
+
+def redetect_fillers(analysis, language=None, extra=(), user_path=DEFAULT_USER_FILLERS):
+    trans = analysis.get("transcription") or {}
+    analysis["filler_segments"] = detect_fillers(trans, language or trans.get("language") or "it", extra, user_path)
+    return analysis["filler_segments"]
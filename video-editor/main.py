@@ -1,28 +1,82 @@
-import os, sys, threading
+import os, sys, time, threading
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import filedialog, messagebox
 sys.path.insert(0, os.path.dirname(__file__))
-from analyzer import analyze_clip
-from timeline import auto_cut_timeline, sync_to_beats, timeline_stats, format_timeline_for_display
+from analyzer import analyze_project_beats, recompute_silences, save_analysis
+from scheduler import analyze_clips
+from cache import AnalysisCache, RenderCache
+from proxy import ProxyManager, render_draft
+from pipeline import run_pipeline
+from store import load_project
+import tracing
+from timeline import BeatGrid, auto_cut_timeline, sync_to_beats, timeline_stats
 from exporter import render_video, export_fcpxml, export_edl, export_csv, export_transcript
 
 BG_DARK="#1a1a2e"; BG_MID="#16213e"; BG_CARD="#0f3460"
 C_ACCENT="#e94560"; C_GREEN="#00b894"; C_YELLOW="#fdcb6e"; C_GRAY="#636e72"
 F_BIG=("Segoe UI",20,"bold"); F_MED=("Segoe UI",12); F_SM=("Segoe UI",10); F_MONO=("Consolas",10)
+UI_FLUSH_MS=33; LOG_MAX_LINES=5000
+
+class VirtualTree:
+    def __init__(self,tree,scrollbar):
+        self.tree=tree; self.sb=scrollbar; self.n=0; self.top=0; self.row_fn=None; self.items=[]
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>",lambda e:self.refresh()); tree.bind("<MouseWheel>",lambda e:self.scroll(-3 if e.delta>0 else 3))
+        tree.bind("<Button-4>",lambda e:self.scroll(-3)); tree.bind("<Button-5>",lambda e:self.scroll(3))
+        tree.bind("<Up>",lambda e:self.key(-1)); tree.bind("<Down>",lambda e:self.key(1))
+        tree.bind("<Prior>",lambda e:self.key(-1,True)); tree.bind("<Next>",lambda e:self.key(1,True))
+
+    def visible(self):
+        rh=int(ttk.Style().lookup("Treeview","rowheight") or 22)
+        return max(1,self.tree.winfo_height()//rh-1)
+
+    def set_rows(self,n,row_fn): self.n=n; self.row_fn=row_fn; self.refresh()
+
+    def refresh(self):
+        vis=min(self.visible(),self.n); self.top=max(0,min(self.top,self.n-vis))
+        while len(self.items)<vis: self.items.append(self.tree.insert("","end"))
+        while len(self.items)>vis: self.tree.delete(self.items.pop())
+        for k,iid in enumerate(self.items):
+            values,tag=self.row_fn(self.top+k); self.tree.item(iid,values=values,tags=(tag,))
+        self.sb.set(*((self.top/self.n,(self.top+vis)/self.n) if self.n else (0,1)))
+
+    def scroll(self,delta):
+        if self.n: self.top+=delta; self.tree.selection_set(()); self.refresh()
+        return "break"
+
+    def key(self,step,page=False):
+        if not self.items: return "break"
+        sel=self.tree.focus() or (self.tree.selection() or ("",))[0]
+        k=self.items.index(sel) if sel in self.items else (0 if step<0 else len(self.items)-1)
+        if not page and 0<=k+step<len(self.items): return None
+        top=self.top; self.scroll(step*(len(self.items) if page else 1))
+        if page and self.top==top: k=0 if step<0 else len(self.items)-1
+        iid=self.items[k]; self.tree.selection_set(iid); self.tree.focus(iid); self.tree.see(iid)
+        return "break"
+
+    def yview(self,*args):
+        if args[0]=="moveto": self.top=int(float(args[1])*self.n); self.tree.selection_set(()); self.refresh()
+        elif args[0]=="scroll": self.scroll(int(args[1])*(self.visible() if args[2]=="pages" else 1))
 
 class WeddingCutApp:
     def __init__(self):
         self.root=tk.Tk(); self.root.title("WeddingCut Pro v1.0")
         self.root.geometry("1200x800"); self.root.minsize(900,600); self.root.configure(bg=BG_DARK)
-        self.video_files=[]; self.analyses=[]; self.timeline_segments=[]
+        self.video_files=[]; self.analyses=[]; self.timeline_segments=[]; self.beat_times=[]
         self.opt_remove_silences=tk.BooleanVar(value=True); self.opt_remove_fillers=tk.BooleanVar(value=True)
         self.opt_scene_det=tk.BooleanVar(value=True); self.opt_transcribe=tk.BooleanVar(value=True)
         self.opt_language=tk.StringVar(value="it"); self.opt_model=tk.StringVar(value="base")
         self.opt_sil_db=tk.DoubleVar(value=-40.0); self.opt_sil_min=tk.DoubleVar(value=0.5)
-        self.opt_framerate=tk.StringVar(value="25"); self.opt_music_file=tk.StringVar(value="")
-        self.opt_sync_beats=tk.BooleanVar(value=False)
-        self._build_ui()
+        self.opt_framerate=tk.StringVar(value="auto"); self.opt_music_file=tk.StringVar(value="")
+        self.opt_sync_beats=tk.BooleanVar(value=False); self._recut_job=None
+        for v in (self.opt_sil_db,self.opt_sil_min): v.trace_add("write",lambda *a:self._schedule_recut())
+        try: self.cache=AnalysisCache(); self.render_cache=RenderCache()
+        except OSError: self.cache=self.render_cache=None
+        try: self.proxies=ProxyManager()
+        except OSError: self.proxies=None
+        self._cancel=threading.Event(); self._ui_lock=threading.Lock(); self._ui_log=[]; self._ui_prog=self._ui_status=None; self._ui_scheduled=False
+        self._build_ui(); self.root.protocol("WM_DELETE_WINDOW",self._on_close)
         self._log("Benvenuto in WeddingCut Pro!")
         self._log("1) Aggiungi video  2) Analizza  3) Auto-Cut  4) Esporta")
 
@@ -37,7 +91,7 @@ class WeddingCutApp:
         h=tk.Frame(self.root,bg=BG_CARD,height=56); h.grid(row=0,column=0,sticky="ew"); h.grid_propagate(False)
         tk.Label(h,text="  WeddingCut Pro",font=F_BIG,bg=BG_CARD,fg="white").pack(side="left",pady=8)
         bf=tk.Frame(h,bg=BG_CARD); bf.pack(side="right",padx=10)
-        for txt,cmd,col in [("+ Aggiungi Video",self._add_videos,C_GREEN),("Analizza",self._start_analysis,"#0984e3"),("Auto-Cut",self._generate_timeline,"#6c5ce7"),("Esporta",self._open_export,"#00cec9")]:
+        for txt,cmd,col in [("+ Aggiungi Video",self._add_videos,C_GREEN),("Analizza",self._start_analysis,"#0984e3"),("Analizza + Esporta",self._start_pipeline,"#0984e3"),("Auto-Cut",self._generate_timeline,"#6c5ce7"),("Esporta",self._open_export,"#00cec9")]:
             self._btn(bf,txt,cmd,col).pack(side="left",padx=3,pady=8)
 
     def _build_files(self,parent):
@@ -53,6 +107,8 @@ class WeddingCutApp:
         br=tk.Frame(f,bg=BG_MID); br.grid(row=3,column=0,pady=6,padx=8,sticky="ew")
         self._btn(br,"Rimuovi",self._remove_sel,C_GRAY,small=True).pack(side="left",padx=2)
         self._btn(br,"Pulisci",self._clear_all,C_GRAY,small=True).pack(side="left",padx=2)
+        self._btn(br,"Apri",self._open_project,C_GRAY,small=True).pack(side="right",padx=2)
+        self._btn(br,"Salva",self._save_project,C_GRAY,small=True).pack(side="right",padx=2)
 
     def _build_center(self,parent):
         f=tk.Frame(parent,bg=BG_DARK); f.grid(row=0,column=1,sticky="nsew",padx=4)
@@ -70,8 +126,8 @@ class WeddingCutApp:
         style.map("Treeview",background=[("selected",C_ACCENT)])
         for c,w in [("N",36),("File",180),("Da",68),("A",68),("Durata",68),("Tipo",80),("Score",55)]:
             self.tree.heading(c,text=c); self.tree.column(c,width=w,anchor="center")
-        tsb=tk.Scrollbar(tf,orient="vertical",command=self.tree.yview); tsb.grid(row=1,column=1,sticky="ns")
-        self.tree.configure(yscrollcommand=tsb.set); self.tree.grid(row=1,column=0,sticky="nsew",padx=(8,0),pady=(0,8))
+        tsb=tk.Scrollbar(tf,orient="vertical"); tsb.grid(row=1,column=1,sticky="ns")
+        self.tree.grid(row=1,column=0,sticky="nsew",padx=(8,0),pady=(0,8)); self.tl_view=VirtualTree(self.tree,tsb)
         self.tree.tag_configure("speech",foreground="#dfe6e9"); self.tree.tag_configure("silence",foreground=C_GRAY)
         self.tree.tag_configure("filler",foreground=C_YELLOW); self.tree.tag_configure("best_scene",foreground=C_GREEN)
         lf=tk.Frame(f,bg=BG_MID); lf.grid(row=1,column=0,sticky="nsew")
@@ -106,8 +162,8 @@ class WeddingCutApp:
         tk.Entry(mrow,textvariable=self.opt_music_file,bg="#0d1b2a",fg="white",font=F_SM,insertbackground="white",borderwidth=0).pack(side="left",fill="x",expand=True)
         self._btn(mrow,"...",self._pick_music,C_GRAY,small=True).pack(side="right")
         self._sec(sf,"ESPORTAZIONE"); self._lbl(sf,"Frame rate:"); frr=tk.Frame(sf,bg=BG_MID); frr.pack(fill="x",padx=12,pady=2)
-        for fr in ["24","25","30"]:
-            tk.Radiobutton(frr,text=f"{fr}fps",variable=self.opt_framerate,value=fr,bg=BG_MID,fg="white",selectcolor=BG_CARD,activebackground=BG_MID,font=F_SM).pack(side="left",padx=3)
+        for fr in ["auto","24","25","30"]:
+            tk.Radiobutton(frr,text="Auto" if fr=="auto" else f"{fr}fps",variable=self.opt_framerate,value=fr,bg=BG_MID,fg="white",selectcolor=BG_CARD,activebackground=BG_MID,font=F_SM).pack(side="left",padx=3)
 
     def _build_footer(self):
         ft=tk.Frame(self.root,bg=BG_MID,height=34); ft.grid(row=2,column=0,sticky="ew"); ft.grid_propagate(False); ft.columnconfigure(1,weight=1)
@@ -148,6 +204,11 @@ class WeddingCutApp:
             if p not in self.video_files and os.path.isfile(p):
                 self.video_files.append(p); self.lb.insert("end",os.path.basename(p)); added+=1
         self._log(f"Aggiunti {added} file. Totale: {len(self.video_files)}")
+        if self.proxies and added:
+            def proxy_done(path,proxy,err):
+                if err is not None: self._log(f"  Proxy non creato [{os.path.basename(path)}]: {err}")
+                elif not self.proxies.pending(): self._log("Proxy pronti per l'anteprima bozza")
+            self.proxies.submit(self.video_files[-added:],on_done=proxy_done)
 
     def _remove_sel(self):
         sel=list(self.lb.curselection())
@@ -155,9 +216,25 @@ class WeddingCutApp:
         self._log(f"Rimossi {len(sel)} file")
 
     def _clear_all(self):
-        self.video_files.clear(); self.lb.delete(0,"end"); self.analyses.clear(); self.timeline_segments.clear()
-        for row in self.tree.get_children(): self.tree.delete(row)
-        self.tl_stats.config(text=""); self._log("Lista svuotata")
+        self.video_files.clear(); self.lb.delete(0,"end"); self.analyses.clear(); self.timeline_segments.clear(); self.beat_times=[]
+        self.tl_view.set_rows(0,None); self.tl_stats.config(text=""); self._log("Lista svuotata")
+
+    def _save_project(self):
+        if not self.analyses: messagebox.showwarning("Attenzione","Prima esegui 'Analizza'!"); return
+        out=filedialog.asksaveasfilename(title="Salva progetto",filetypes=[("Progetto WeddingCut","*.npz")],defaultextension=".npz",initialfile="progetto.npz")
+        if not out: return
+        try: save_analysis(self.analyses,out); self._log(f"Progetto salvato: {out}")
+        except Exception as e: self._log(f"ERRORE salvataggio: {e}")
+
+    def _open_project(self):
+        p=filedialog.askopenfilename(title="Apri progetto",filetypes=[("Progetto WeddingCut","*.npz *.json"),("Tutti","*.*")])
+        if not p: return
+        try:
+            analyses=load_project(p)
+        except Exception as e: self._log(f"ERRORE apertura: {e}"); return
+        self._clear_all(); self.analyses=list(analyses)
+        for a in self.analyses: self.video_files.append(a["video_path"]); self.lb.insert("end",a.get("filename") or os.path.basename(a["video_path"]))
+        self._log(f"Progetto aperto: {os.path.basename(p)} ({len(self.analyses)} clip)"+(" - convertito in formato compatto .npz" if p.endswith(".json") else ""))
 
     def _pick_music(self):
         p=filedialog.askopenfilename(title="Seleziona musica",filetypes=[("Audio","*.mp3 *.wav *.aac *.flac *.m4a"),("Tutti","*.*")])
@@ -167,42 +244,97 @@ class WeddingCutApp:
         if not self.video_files: messagebox.showwarning("Attenzione","Aggiungi almeno un video!"); return
         self.analyses.clear(); threading.Thread(target=self._analysis_worker,daemon=True).start()
 
-    def _analysis_worker(self):
-        opts={"silence_threshold_db":self.opt_sil_db.get(),"min_silence_duration":self.opt_sil_min.get(),"run_transcription":self.opt_transcribe.get(),"transcription_language":self.opt_language.get(),"whisper_model":self.opt_model.get(),"run_scene_detection":self.opt_scene_det.get(),"run_beat_detection":self.opt_sync_beats.get(),"audio_file_for_beats":self.opt_music_file.get() or None}
-        total=len(self.video_files); self._set_status("Analisi in corso..."); self._log(f"\nInizio analisi di {total} file...")
-        for i,path in enumerate(self.video_files):
-            self._prog(int(i/total*100),f"Analizzo {os.path.basename(path)}..."); self._log(f"\n[{i+1}/{total}] {os.path.basename(path)}")
-            try:
-                result=analyze_clip(path,opts); self.analyses.append(result)
-                self._log(f"  OK: {len(result.get('silences',[]))} silenzi, {len(result.get('filler_segments',[]))} filler, {len(result.get('best_scenes',[]))} scene top")
-                for err in result.get("errors",[]): self._log(f"  ATTENZIONE: {err}")
-            except Exception as e: self._log(f"  ERRORE: {e}")
-        self._prog(100,"Analisi completata!"); self._set_status("Analisi completata"); self._log("\nFatto! Ora clicca 'Auto-Cut'.")
-
-    def _generate_timeline(self):
+    def _start_pipeline(self):
+        if not self.video_files: messagebox.showwarning("Attenzione","Aggiungi almeno un video!"); return
+        out=filedialog.asksaveasfilename(title="Salva video finale come...",filetypes=[("MP4","*.mp4")],initialfile="wedding_finale.mp4")
+        if not out: return
+        self.analyses.clear(); threading.Thread(target=self._analysis_worker,args=(out,),daemon=True).start()
+
+    def _analysis_worker(self,out=None):
+        opts={"silence_threshold_db":self.opt_sil_db.get(),"min_silence_duration":self.opt_sil_min.get(),"run_transcription":self.opt_transcribe.get(),"transcription_language":self.opt_language.get(),"whisper_model":self.opt_model.get(),"run_scene_detection":self.opt_scene_det.get()}
+        total=len(self.video_files); self._set_status("Analisi in corso..." if out is None else "Analisi ed esportazione in corso..."); self._log(f"\nInizio analisi di {total} file...")
+        def started(i,path): self._log(f"\n[{i+1}/{total}] {os.path.basename(path)}")
+        def finished(done,i,path,result,err):
+            name=os.path.basename(path)
+            if out is None: self._prog(int(done/total*100),f"Analizzati {done}/{total}: {name}")
+            if err is not None: self._log(f"  ERRORE [{name}]: {err}"); return
+            self._log(f"  OK [{name}]: {len(result.get('silences',[]))} silenzi, {len(result.get('filler_segments',[]))} filler, {len(result.get('best_scenes',[]))} scene top")
+            for e in result.get("errors",[]): self._log(f"  ATTENZIONE [{name}]: {e}")
+        self._prog(0,f"Analizzo {total} file...")
+        if self.cache: self.cache.reset_stats()
+        tracer=tracing.enable()
+        if tracer is None: self._log("  Tempi non registrati: un altro lavoro tracciato è in corso")
+        try:
+            self.beat_times=[]; music=self.opt_music_file.get()
+            if self.opt_sync_beats.get() and music:
+                self._log(f"Analisi beat: {os.path.basename(music)}")
+                try: self.beat_times=analyze_project_beats(music,self.cache); self._log(f"  {len(self.beat_times)} beat rilevati")
+                except Exception as e: self._log(f"  ERRORE beat: {e}")
+            if out is not None: return self._pipeline_run(out,opts,finished,tracer)
+            self.analyses=[r for r in analyze_clips(self.video_files,opts,on_start=started,on_done=finished,cache=self.cache,cancel=self._cancel) if r is not None]
+            if self.cache: st=self.cache.stats(); self._log(f"Cache analisi: {st['hits']} hit, {st['misses']} miss ({st['bytes']/1048576:.1f} MB)")
+            self._trace_report(tracer,"analisi")
+            self._prog(100,"Analisi completata!"); self._set_status("Analisi completata"); self._log("\nFatto! Ora clicca 'Auto-Cut'.")
+        except Exception as e:
+            self._log(f"  ERRORE: {e}"); self._prog(0,"Analisi interrotta"); self._set_status("Errore")
+        finally:
+            if tracer: tracing.disable(tracer)
+
+    def _pipeline_run(self,out,opts,finished,tracer):
+        cut={"remove_silences":self.opt_remove_silences.get(),"remove_fillers":self.opt_remove_fillers.get(),"min_segment_duration":0.3,"padding_seconds":0.05}
+        beats=self.beat_times if self.opt_sync_beats.get() else []
+        try:
+            if self.render_cache: self.render_cache.reset_stats()
+            self.analyses,segs=run_pipeline(self.video_files,out,opts,cut,beats,progress_callback=lambda p,m:self._prog(p,m),on_clip=finished,cache=self.cache,render_cache=self.render_cache,cancel=self._cancel)
+            self._trace_report(tracer,"analisi ed esportazione"); self._log(f"  Salvato: {out}"); self._set_status("Esportazione completata!")
+            self.root.after(0,lambda:self._show_timeline(segs))
+            self.root.after(0,lambda:messagebox.showinfo("Successo!",f"File salvato:\n{out}"))
+        except Exception as e:
+            if tracer: tracing.disable(tracer)
+            self._log(f"  ERRORE: {e}"); self._set_status("Errore")
+            self.root.after(0,lambda:messagebox.showerror("Errore",str(e)))
+
+    def _schedule_recut(self):
+        if not self.analyses: return
+        if self._recut_job: self.root.after_cancel(self._recut_job)
+        self._recut_job=self.root.after(150,self._recut)
+
+    def _recut(self):
+        self._recut_job=None
+        try: db,mn=self.opt_sil_db.get(),self.opt_sil_min.get()
+        except tk.TclError: return
+        for a in self.analyses: recompute_silences(a,db,mn)
+        if self.timeline_segments: self._generate_timeline(quiet=True)
+
+    def _generate_timeline(self,quiet=False):
         if not self.analyses: messagebox.showwarning("Attenzione","Prima esegui 'Analizza'!"); return
-        self._log("\nGenerazione timeline automatica...")
+        if not quiet: self._log("\nGenerazione timeline automatica...")
         opts={"remove_silences":self.opt_remove_silences.get(),"remove_fillers":self.opt_remove_fillers.get(),"min_segment_duration":0.3,"padding_seconds":0.05}
         try:
             segs=auto_cut_timeline(self.analyses,opts)
             if self.opt_sync_beats.get():
-                beats=[b for a in self.analyses for b in a.get("beat_times",[])]
-                if beats: segs=sync_to_beats(segs,beats); self._log("  Tagli sincronizzati ai beat")
-            self.timeline_segments=segs
-            for row in self.tree.get_children(): self.tree.delete(row)
-            for item in format_timeline_for_display(segs):
-                self.tree.insert("","end",values=(item["index"],item["source_file"][:22],f"{item['source_start']:.1f}s",f"{item['source_end']:.1f}s",f"{item['duration']:.1f}s",item["type"],f"{item['score']:.0f}" if item["score"]>0 else "-"),tags=(item["type"],))
-            st=timeline_stats(segs); dur=st["total_duration"]; mm,ss=int(dur//60),dur%60
-            self._log(f"Timeline: {st['n_segments']} segmenti, {mm}:{ss:05.2f}")
-            self.tl_stats.config(text=f"{st['n_segments']} segmenti  |  {mm}:{ss:05.2f}")
+                if self.beat_times:
+                    segs=sync_to_beats(segs,BeatGrid(self.beat_times))
+                    if not quiet: self._log("  Tagli sincronizzati ai beat")
+            self._show_timeline(segs,quiet)
         except Exception as e: self._log(f"ERRORE: {e}")
 
+    def _show_timeline(self,segs,quiet=False):
+        self.timeline_segments=segs
+        self.tl_view.set_rows(len(segs),lambda i:self._timeline_row(segs,i))
+        st=timeline_stats(segs); dur=st["total_duration"]; mm,ss=int(dur//60),dur%60
+        if not quiet: self._log(f"Timeline: {st['n_segments']} segmenti, {mm}:{ss:05.2f}")
+        self.tl_stats.config(text=f"{st['n_segments']} segmenti  |  {mm}:{ss:05.2f}")
+
+    def _timeline_row(self,segs,i):
+        seg=segs[i]; return (i+1,seg.clip_label[:22],f"{seg.start:.1f}s",f"{seg.end:.1f}s",f"{seg.duration:.1f}s",seg.segment_type,f"{seg.score:.0f}" if seg.score>0 else "-"),seg.segment_type
+
     def _open_export(self):
         if not self.timeline_segments: messagebox.showwarning("Attenzione","Prima genera la timeline con 'Auto-Cut'!"); return
-        dlg=tk.Toplevel(self.root); dlg.title("Esporta"); dlg.geometry("480x340"); dlg.configure(bg=BG_MID); dlg.grab_set()
+        dlg=tk.Toplevel(self.root); dlg.title("Esporta"); dlg.geometry("480x400"); dlg.configure(bg=BG_MID); dlg.grab_set()
         tk.Label(dlg,text="Scegli il formato di esportazione",font=F_MED,bg=BG_MID,fg="white").pack(pady=14)
         var=tk.StringVar(value="video")
-        for val,lab,desc in [("video","Video finale (.mp4)","Rendering completo pronto da consegnare"),("fcpxml","DaVinci Resolve XML (.fcpxml)","Apri in DaVinci Resolve (gratuito)"),("edl","EDL universale (.edl)","Compatibile con Premiere, Avid, Final Cut"),("csv","Foglio Excel (.csv)","Lista leggibile di tutti i tagli"),("transcript","Trascrizione testo (.txt)","Testo completo del parlato")]:
+        for val,lab,desc in [("video","Video finale (.mp4)","Rendering completo pronto da consegnare"),("video_smart","Video rapido (.mp4)","Copia diretta, ricodifica solo ai tagli"),("draft","Anteprima bozza (.mp4)","Dai proxy a bassa risoluzione, pronta in pochi secondi"),("fcpxml","DaVinci Resolve XML (.fcpxml)","Apri in DaVinci Resolve (gratuito)"),("edl","EDL universale (.edl)","Compatibile con Premiere, Avid, Final Cut"),("csv","Foglio Excel (.csv)","Lista leggibile di tutti i tagli"),("transcript","Trascrizione testo (.txt)","Testo completo del parlato")]:
             row=tk.Frame(dlg,bg=BG_MID); row.pack(fill="x",padx=20,pady=2)
             tk.Radiobutton(row,text=lab,variable=var,value=val,bg=BG_MID,fg="white",selectcolor=BG_CARD,activebackground=BG_MID,font=F_SM).pack(side="left")
             tk.Label(row,text=f"  {desc}",bg=BG_MID,fg=C_GRAY,font=("Segoe UI",8)).pack(side="left")
@@ -211,37 +343,75 @@ class WeddingCutApp:
         self._btn(dlg,"Esporta",go,C_ACCENT).pack(pady=14)
 
     def _run_export(self,fmt):
-        ext={"video":[("MP4","*.mp4")],"fcpxml":[("FCPXML","*.fcpxml")],"edl":[("EDL","*.edl")],"csv":[("CSV","*.csv")],"transcript":[("Testo","*.txt")]}
-        default={"video":"wedding_finale.mp4","fcpxml":"wedding_timeline.fcpxml","edl":"wedding_timeline.edl","csv":"wedding_tagli.csv","transcript":"trascrizione.txt"}
+        ext={"video":[("MP4","*.mp4")],"video_smart":[("MP4","*.mp4")],"draft":[("MP4","*.mp4")],"fcpxml":[("FCPXML","*.fcpxml")],"edl":[("EDL","*.edl")],"csv":[("CSV","*.csv")],"transcript":[("Testo","*.txt")]}
+        default={"video":"wedding_finale.mp4","video_smart":"wedding_finale.mp4","draft":"wedding_bozza.mp4","fcpxml":"wedding_timeline.fcpxml","edl":"wedding_timeline.edl","csv":"wedding_tagli.csv","transcript":"trascrizione.txt"}
         out=filedialog.asksaveasfilename(title="Salva come...",filetypes=ext[fmt],initialfile=default[fmt])
         if not out: return
         threading.Thread(target=self._export_worker,args=(fmt,out),daemon=True).start()
 
     def _export_worker(self,fmt,out):
         self._set_status(f"Esportazione {fmt}..."); self._log(f"\nEsporto {fmt}: {os.path.basename(out)}")
+        tracer=tracing.enable()
+        if tracer is None: self._log("  Tempi non registrati: un altro lavoro tracciato è in corso")
         try:
-            fr=int(self.opt_framerate.get())
-            if fmt=="video": render_video(self.timeline_segments,out,progress_callback=lambda p,m:self._prog(p,m))
-            elif fmt=="fcpxml": export_fcpxml(self.timeline_segments,out,frame_rate=str(fr))
+            fr=None if self.opt_framerate.get()=="auto" else int(self.opt_framerate.get())
+            if fmt in ("video","video_smart"):
+                if self.render_cache: self.render_cache.reset_stats()
+                render_video(self.timeline_segments,out,progress_callback=lambda p,m:self._prog(p,m),smart_render=fmt=="video_smart",cache=self.render_cache)
+                if self.render_cache: st=self.render_cache.stats(); self._log(f"  Cache render: {st['hits']} segmenti riutilizzati, {st['misses']} codificati")
+            elif fmt=="draft": render_draft(self.timeline_segments,out,self.proxies,progress_callback=lambda p,m:self._prog(p,m))
+            elif fmt=="fcpxml": export_fcpxml(self.timeline_segments,out,frame_rate=fr)
             elif fmt=="edl": export_edl(self.timeline_segments,out,frame_rate=fr)
             elif fmt=="csv": export_csv(self.timeline_segments,out)
             elif fmt=="transcript": export_transcript(self.analyses,out)
-            self._log(f"  Salvato: {out}"); self._set_status("Esportazione completata!"); self._prog(100,"Fatto!")
+            self._trace_report(tracer,f"esportazione {fmt}"); self._log(f"  Salvato: {out}"); self._set_status("Esportazione completata!"); self._prog(100,"Fatto!")
             self.root.after(0,lambda:messagebox.showinfo("Successo!",f"File salvato:\n{out}"))
         except Exception as e:
             self._log(f"  ERRORE: {e}"); self._set_status("Errore")
             self.root.after(0,lambda:messagebox.showerror("Errore",str(e)))
+        finally:
+            if tracer: tracing.disable(tracer)
+
+    def _trace_report(self,tracer,label):
+        if tracer is None: return
+        tracing.disable(tracer); summary=tracer.format_summary()
+        if summary: self._log(f"Tempi {label}:\n{summary}")
+        trace_dir=os.environ.get("WEDDINGCUT_TRACE_DIR")
+        if trace_dir:
+            try: self._log(f"  Trace: {tracer.dump_chrome(os.path.join(trace_dir,time.strftime('%Y%m%d_%H%M%S_')+label.replace(' ','_')+'.json'))}")
+            except OSError as e: self._log(f"  ERRORE trace: {e}")
+
+    def _ui_post(self,log=None,prog=None,status=None):
+        with self._ui_lock:
+            if log is not None: self._ui_log.append(log)
+            if prog is not None: self._ui_prog=prog
+            if status is not None: self._ui_status=status
+            if self._ui_scheduled: return
+            self._ui_scheduled=True
+        self.root.after(UI_FLUSH_MS,self._ui_flush)
+
+    def _ui_flush(self):
+        with self._ui_lock:
+            lines,prog,status=self._ui_log,self._ui_prog,self._ui_status
+            self._ui_log=[]; self._ui_prog=self._ui_status=None; self._ui_scheduled=False
+        if lines:
+            w=self.log_widget; w.configure(state="normal"); w.insert("end","\n".join(lines)+"\n")
+            n=int(w.index("end-1c").split(".")[0])
+            if n>LOG_MAX_LINES: w.delete("1.0",f"{n-LOG_MAX_LINES}.0")
+            w.see("end"); w.configure(state="disabled")
+        if prog is not None: self.pbar.configure(value=prog[0]); self.plabel.config(text=prog[1])
+        if status is not None: self.status_lbl.config(text=status)
+
+    def _log(self,msg): self._ui_post(log=msg)
 
-    def _log(self,msg):
-        def _do():
-            self.log_widget.configure(state="normal"); self.log_widget.insert("end",msg+"\n")
-            self.log_widget.see("end"); self.log_widget.configure(state="disabled")
-        self.root.after(0,_do)
+    def _set_status(self,text): self._ui_post(status=text)
 
-    def _set_status(self,text): self.root.after(0,lambda:self.status_lbl.config(text=text))
+    def _prog(self,val,msg=""): self._ui_post(prog=(val,msg))
 
-    def _prog(self,val,msg=""):
-        self.root.after(0,lambda:(self.pbar.configure(value=val),self.plabel.config(text=msg)))
+    def _on_close(self):
+        self._cancel.set()
+        if self.proxies: self.proxies.shutdown(cancel=True)
+        self.root.destroy()
 
     def run(self): self.root.mainloop()
 
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import tracing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".weddingcut", "media.json")
+FINGERPRINT_BLOCK = 1 << 20
+REGISTRY_MAX_ENTRIES = 5000
+REGISTRY_MAX_AGE = 180 * 86400
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+def file_fingerprint(path, block_size=FINGERPRINT_BLOCK):
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _fingerprint_lock:
+        if memo_key in _fingerprints:
+            return _fingerprints[memo_key]
+    h = hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        h.update(f.read(block_size))
+        if st.st_size > block_size:
+            f.seek(max(block_size, st.st_size - block_size))
+            h.update(f.read(block_size))
+    fp = h.hexdigest()
+    with _fingerprint_lock:
+        _fingerprints[memo_key] = fp
+    return fp
+
+def _fraction(value):
+    try:
+        num, den = str(value).split("/")
+        return float(num) / float(den) if float(den) else 0.0
+    except ValueError:
+        return 0.0
+
+def probe_media(video_path):
+    cmd = ["ffprobe","-v","quiet","-print_format","json","-show_format","-show_streams",video_path]
+    result = tracing.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"duration": 0.0}
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video" and not st.get("disposition",{}).get("attached_pic")), {})
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), {})
+    return {"duration": float(data.get("format",{}).get("duration",0) or 0), "start_time": float(data.get("format",{}).get("start_time",0) or 0), "format": data.get("format",{}).get("format_name",""), "has_video": bool(video), "has_audio": bool(audio),
+            "codec": video.get("codec_name",""), "width": int(video.get("width",0) or 0), "height": int(video.get("height",0) or 0), "pix_fmt": video.get("pix_fmt",""), "profile": video.get("profile",""),
+            "r_frame_rate": video.get("r_frame_rate",""), "fps": _fraction(video.get("avg_frame_rate") or video.get("r_frame_rate","0/1")) or _fraction(video.get("r_frame_rate","0/1")),
+            "audio_codec": audio.get("codec_name",""), "sample_rate": int(audio.get("sample_rate",0) or 0), "channels": int(audio.get("channels",0) or 0)}
+
+class MediaRegistry:
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, max_workers=4, max_entries=REGISTRY_MAX_ENTRIES, max_age=REGISTRY_MAX_AGE):
+        self.path = path
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.keyframes_dir = os.path.join(os.path.dirname(path) or ".", "keyframes")
+        self.probes = 0
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+        now = time.time()
+        for entry in self._entries.values():
+            if entry.pop("keyframes", None) is not None or "seen" not in entry:
+                entry.setdefault("seen", now)
+                self._dirty = True
+
+    def _key(self, video_path):
+        return file_fingerprint(video_path)
+
+    def _keyframes_path(self, key):
+        return os.path.join(self.keyframes_dir, key[:2], f"{key}.npy")
+
+    def _with_keyframes(self, key, entry):
+        entry = dict(entry)
+        if entry.pop("keyframes_file", False):
+            try:
+                entry["keyframes"] = np.load(self._keyframes_path(key)).tolist()
+            except (OSError, ValueError):
+                pass
+        return entry
+
+    def lookup(self, video_path):
+        try:
+            key = self._key(video_path)
+        except OSError:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or "start_time" not in entry:
+                return None
+            if now - entry.get("seen", 0) > 86400:
+                entry["seen"] = now
+                self._dirty = True
+        return self._with_keyframes(key, entry)
+
+    def get(self, video_path):
+        media = self.lookup(video_path)
+        if media is not None:
+            return media
+        media = probe_media(video_path)
+        with self._lock:
+            self.probes += 1
+        if media["duration"] > 0:
+            with self._lock:
+                self._entries[self._key(video_path)] = dict(media, seen=time.time())
+                self._dirty = True
+        return media
+
+    def update(self, video_path, **fields):
+        key = self._key(video_path)
+        keyframes = fields.pop("keyframes", None)
+        if keyframes is not None:
+            out = self._keyframes_path(key)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            tmp = f"{out}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(keyframes, dtype=np.float64))
+            os.replace(tmp, out)
+            fields["keyframes_file"] = True
+        with self._lock:
+            entry = dict(self._entries.get(key, {}))
+            entry.update(fields, seen=time.time())
+            self._entries[key] = entry
+            self._dirty = True
+        return self._with_keyframes(key, entry)
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        ranked = sorted(self._entries, key=lambda k: self._entries[k].get("seen", 0), reverse=True)
+        for n, k in enumerate(ranked):
+            if n >= self.max_entries or self._entries[k].get("seen", 0) < cutoff:
+                if self._entries.pop(k).get("keyframes_file"):
+                    try: os.remove(self._keyframes_path(k))
+                    except OSError: pass
+
+    def probe_many(self, video_paths):
+        paths = list(dict.fromkeys(video_paths))
+        missing = [p for p in paths if self.lookup(p) is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as ex:
+                list(ex.map(self.get, missing))
+        return {p: self.lookup(p) or {"duration": 0.0} for p in paths}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._evict()
+            data = dict(self._entries)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MediaRegistry()
+        return _registry
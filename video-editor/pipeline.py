@@ -0,0 +1,97 @@
+import os
+import threading
+from scheduler import analyze_clips
+from timeline import BeatGrid, SegmentTable, auto_cut_table, trim_to_duration, sync_to_beats
+from exporter import SegmentRenderer
+
+def default_render_workers():
+    return max(1, (os.cpu_count() or 2) // 4)
+
+class IncrementalTimeline:
+    def __init__(self, n_clips, options=None, beat_times=()):
+        self.options = dict(options or {})
+        self.max_duration = self.options.pop("max_total_duration", None)
+        self.min_seg_dur = self.options.get("min_segment_duration", 0.3)
+        self.grid = beat_times if isinstance(beat_times, BeatGrid) else BeatGrid(beat_times) if len(beat_times) else None
+        self.tables = {}
+        self._pending = [None] * n_clips
+        self._ready = [False] * n_clips
+        self._next = 0
+        self._used = 0.0
+        self._full = False
+
+    def add(self, i, analysis):
+        table = auto_cut_table([analysis], self.options) if analysis is not None else None
+        if not self.max_duration:
+            return [self._emit(i, table)] if table is not None and len(table) else []
+        self._pending[i], self._ready[i] = table, True
+        out = []
+        while self._next < len(self._ready) and self._ready[self._next]:
+            n, table = self._next, self._pending[self._next]
+            self._pending[n] = None
+            self._next += 1
+            if table is None or self._full:
+                continue
+            table, self._used, self._full = trim_to_duration(table, self.max_duration, self.min_seg_dur, self._used)
+            if len(table):
+                out.append(self._emit(n, table))
+        return out
+
+    def _emit(self, i, table):
+        if self.grid is not None and len(self.grid):
+            table = sync_to_beats(table, self.grid)
+        self.tables[i] = table
+        return i, table
+
+    @property
+    def table(self):
+        return SegmentTable.concat(self.tables[i] for i in sorted(self.tables))
+
+    @property
+    def segments(self):
+        return self.table.segments()
+
+def run_pipeline(video_paths, output_path, analysis_options=None, cut_options=None, beat_times=(), render_options=None, progress_callback=None, on_clip=None, cache=None, render_cache=None, limiter=None, smart_render=False, cancel=None):
+    video_paths = list(video_paths)
+    total = len(video_paths)
+    builder = IncrementalTimeline(total, cut_options, beat_times)
+    render_options = dict(render_options or {})
+    render_options.setdefault("max_workers", default_render_workers())
+    lock = threading.Lock()
+    analyzed = [0]
+
+    def encoded(done, n_jobs):
+        if progress_callback:
+            progress_callback(int(90 * min(done / n_jobs, analyzed[0] / total)), f"Analizzati {analyzed[0]}/{total}, segmenti completati {done}/{n_jobs}...")
+
+    renderer = SegmentRenderer(output_path, smart_render=smart_render, cache=render_cache, on_job_done=encoded, **render_options)
+
+    def finished(done, i, path, result, err):
+        with lock:
+            analyzed[0] = done
+            for slot, table in builder.add(i, result if err is None else None):
+                renderer.submit(table, slot)
+        if on_clip:
+            on_clip(done, i, path, result, err)
+
+    try:
+        if progress_callback:
+            progress_callback(0, f"Analizzo ed esporto {total} file ({renderer.pool.max_workers} codifiche in parallelo)...")
+        analyses = [r for r in analyze_clips(video_paths, analysis_options, on_done=finished, cache=cache, limiter=limiter, cancel=cancel) if r is not None]
+        if cancel is not None and cancel.is_set():
+            raise RuntimeError("Esportazione annullata")
+        renderer.wait()
+        table = builder.table
+        if not len(table):
+            raise ValueError("Nessun segmento da esportare")
+        if progress_callback:
+            progress_callback(92, "Unisco i segmenti...")
+        renderer.concat()
+        if progress_callback:
+            progress_callback(100, f"Esportazione completata! {len(table)} segmenti" + (f", riutilizzati {renderer.reused}" if render_cache is not None else ""))
+        return analyses, table.segments()
+    except BaseException:
+        renderer.abort()
+        raise
+    finally:
+        renderer.close()
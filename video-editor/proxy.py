@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from media import file_fingerprint
+from timeline import Segment
+from exporter import EncodePool, render_video
+import tracing
+
+DEFAULT_PROXY_DIR = os.path.join(os.path.expanduser("~"), ".weddingcut", "proxy")
+PROXY_HEIGHT = 540
+PROXY_GOP = 12
+DRAFT_RESOLUTION = "960x540"
+
+def proxy_cmd(video_path, out, height=PROXY_HEIGHT, gop=PROXY_GOP, threads=0):
+    return ["ffmpeg","-y","-v","error","-i",video_path,"-map","0:v:0","-map","0:a:0?","-vf",f"scale=-2:'min({height},ih)'","-c:v","libx264","-preset","veryfast","-crf","28",
+            "-g",str(gop),"-keyint_min",str(gop),"-sc_threshold","0","-pix_fmt","yuv420p","-threads",str(threads),"-c:a","aac","-b:a","96k","-ac","2","-movflags","+faststart","-f","mp4",out]
+
+class ProxyManager:
+    def __init__(self, proxy_dir=DEFAULT_PROXY_DIR, max_workers=1, threads_per_job=None, height=PROXY_HEIGHT, gop=PROXY_GOP):
+        self.proxy_dir = proxy_dir
+        self.height = height
+        self.gop = gop
+        os.makedirs(proxy_dir, exist_ok=True)
+        self._pool = EncodePool(max_workers, threads_per_job or max(1, (os.cpu_count() or 2) // 2))
+        self._ex = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, video_path):
+        key = file_fingerprint(video_path)
+        return os.path.join(self.proxy_dir, key[:2], f"{key}_{self.height}p.mp4")
+
+    def get(self, video_path):
+        try:
+            p = self.path_for(video_path)
+        except OSError:
+            return None
+        return p if os.path.exists(p) else None
+
+    def _make(self, video_path, on_done):
+        proxy, error = None, None
+        try:
+            out = self.path_for(video_path)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            tmp = f"{out}.{threading.get_ident()}.part"
+            with tracing.span("proxy", "proxy", clip=os.path.basename(video_path)):
+                try:
+                    self._pool.run_ffmpeg(proxy_cmd(video_path, tmp, self.height, self.gop, self._pool.threads_per_job))
+                    os.replace(tmp, out)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            proxy = out
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._pending.pop(video_path, None)
+        if on_done:
+            on_done(video_path, proxy, error)
+        return proxy
+
+    def submit(self, video_paths, on_done=None):
+        futures = []
+        for path in video_paths:
+            with self._lock:
+                if path in self._pending or self.get(path):
+                    continue
+                self._pending[path] = f = self._ex.submit(self._make, path, on_done)
+            futures.append(f)
+        return futures
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self._pool.abort()
+        self._ex.shutdown(wait=not cancel, cancel_futures=cancel)
+
+def proxy_segments(segments, proxies):
+    out = []
+    used = 0
+    for seg in segments:
+        proxy = proxies.get(seg.video_path) if proxies is not None else None
+        used += proxy is not None
+        s = Segment(proxy or seg.video_path, seg.start, seg.end, seg.clip_label, seg.segment_type)
+        s.score, s.keep = seg.score, seg.keep
+        out.append(s)
+    return out, used
+
+def render_draft(segments, output_path, proxies=None, progress_callback=None, resolution=DRAFT_RESOLUTION, crf=30, max_workers=None):
+    segs, used = proxy_segments(segments, proxies)
+    if progress_callback:
+        progress_callback(0, f"Bozza: {used}/{len(segs)} segmenti dai proxy")
+    return render_video(segs, output_path, progress_callback, crf=crf, resolution=resolution, max_workers=max_workers, threads_per_job=1, preset="ultrafast")
@@ -0,0 +1,67 @@
+import os
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from analyzer import analyze_clip
+from media import get_registry
+import tracing
+
+def default_stage_limits():
+    cpu = os.cpu_count() or 2
+    return {"probe": 4, "demux": max(1, cpu // 2), "silence": cpu, "transcription": 1, "scenes": max(1, cpu // 4)}
+
+class StageLimiter:
+    def __init__(self, limits=None):
+        self.limits = default_stage_limits()
+        if limits:
+            self.limits.update(limits)
+        self._sems = {name: threading.BoundedSemaphore(max(1, int(n))) for name, n in self.limits.items()}
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        sem = self._sems.get(name)
+        if sem is None:
+            yield
+            return
+        with sem:
+            yield
+
+def analyze_clips(video_paths, options=None, max_workers=None, stage_limits=None, on_start=None, on_done=None, cache=None, limiter=None, cancel=None):
+    video_paths = list(video_paths)
+    if not video_paths:
+        return []
+    limiter = limiter or StageLimiter(stage_limits)
+    workers = max_workers or min(len(video_paths), os.cpu_count() or 2)
+    results = [None] * len(video_paths)
+    lock = threading.Lock()
+    done = [0]
+
+    def run(i, path):
+        if cancel is not None and cancel.is_set():
+            return
+        if on_start:
+            on_start(i, path)
+        error = None
+        try:
+            with tracing.span("clip", "clip", clip=os.path.basename(path)):
+                results[i] = analyze_clip(path, options, limiter, cache)
+        except Exception as e:
+            error = e
+        with lock:
+            done[0] += 1
+            n_done = done[0]
+        if on_done:
+            on_done(n_done, i, path, results[i], error)
+
+    registry = get_registry()
+    try:
+        registry.probe_many(video_paths)
+    except Exception:
+        pass
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for f in [pool.submit(run, i, p) for i, p in enumerate(video_paths)]:
+                f.result()
+    finally:
+        registry.save()
+    return results
@@ -0,0 +1,163 @@
+import os
+import json
+import threading
+import numpy as np
+from analyzer import encode_envelope, decode_envelope, load_analysis
+
+STORE_VERSION = 1
+LAZY_KEYS = ("silences", "best_scenes", "filler_segments", "transcription", "rms_envelope", "beat_times", "media")
+
+def _pack_strings(strings):
+    return np.frombuffer("\x00".join(strings).encode("utf-8"), dtype=np.uint8)
+
+def _unpack_strings(arr, n):
+    return arr.tobytes().decode("utf-8").split("\x00") if n else []
+
+def _columns(rows, keys, dtype=np.float64):
+    return np.array([[r.get(k, 0.0) for k in keys] for r in rows], dtype=dtype).reshape(len(rows), len(keys))
+
+def _pack_clip(i, a, arrays):
+    p = f"{i}_"
+    trans = a.get("transcription") or {}
+    segments = trans.get("segments", [])
+    words = [(s, w) for s, seg in enumerate(segments) for w in seg.get("words", [])]
+    fillers = a.get("filler_segments", [])
+    arrays[p+"sil"] = _columns(a.get("silences", []), ("start", "end"))
+    arrays[p+"scn"] = _columns(a.get("best_scenes", []), ("timestamp", "score"))
+    arrays[p+"fil"] = _columns(fillers, ("start", "end"))
+    arrays[p+"fil_txt"] = _pack_strings([f.get("word", "") for f in fillers])
+    arrays[p+"seg"] = _columns(segments, ("start", "end"))
+    arrays[p+"seg_txt"] = _pack_strings([seg.get("text", "") for seg in segments])
+    arrays[p+"wrd"] = _columns([w for s, w in words], ("start", "end"))
+    arrays[p+"wrd_prob"] = np.array([w.get("probability", 0.0) for s, w in words], dtype=np.float32)
+    arrays[p+"wrd_seg"] = np.array([s for s, w in words], dtype=np.int32)
+    arrays[p+"wrd_fil"] = np.array([any(f is w or f == w for f in segments[s].get("fillers", [])) for s, w in words], dtype=bool)
+    arrays[p+"wrd_txt"] = _pack_strings([w.get("word", "") for s, w in words])
+    arrays[p+"beats"] = np.asarray(a.get("beat_times", []), dtype=np.float64)
+    media = dict(a.get("media") or {})
+    keyframes = media.pop("keyframes", None)
+    if keyframes is not None:
+        arrays[p+"kf"] = np.asarray(keyframes, dtype=np.float64)
+    env = a.get("rms_envelope")
+    if env:
+        arrays[p+"rms"] = np.asarray(decode_envelope(env), dtype=np.float32)
+    header = {k: v for k, v in a.items() if k not in LAZY_KEYS}
+    header["_store"] = {"n_fillers": len(fillers), "n_segments": len(segments), "n_words": len(words),
+                        "transcription": {k: v for k, v in trans.items() if k not in ("segments", "text", "filler_segments")},
+                        "frame_duration": env["frame_duration"] if env else None, "media": media, "keyframes": keyframes is not None}
+    return header
+
+class _Source:
+    def __init__(self, path):
+        self.npz = np.load(path, allow_pickle=False)
+        self.lock = threading.Lock()
+
+    def array(self, key):
+        with self.lock:
+            return self.npz[key]
+
+    def close(self):
+        with self.lock:
+            self.npz.close()
+
+class LazyAnalysis(dict):
+    def __init__(self, header, source, index):
+        meta = header.pop("_store")
+        super().__init__(header)
+        self._meta = meta
+        self._source = source
+        self._index = index
+
+    def _array(self, name):
+        return self._source.array(f"{self._index}_{name}")
+
+    def _load(self, key):
+        m = self._meta
+        if key == "silences":
+            return [{"start": s, "end": e, "duration": e - s, "type": "silence"} for s, e in self._array("sil").tolist()]
+        if key == "best_scenes":
+            return [{"timestamp": t, "score": sc, "type": "best_scene"} for t, sc in self._array("scn").tolist()]
+        if key == "filler_segments":
+            return [{"start": s, "end": e, "word": w, "type": "filler"} for (s, e), w in zip(self._array("fil").tolist(), _unpack_strings(self._array("fil_txt"), m["n_fillers"]))]
+        if key == "beat_times":
+            return self._array("beats").tolist()
+        if key == "media":
+            media = dict(m.get("media") or {})
+            if m.get("keyframes"):
+                media["keyframes"] = self._array("kf").tolist()
+            return media
+        if key == "rms_envelope":
+            return encode_envelope(self._array("rms"), m["frame_duration"]) if m["frame_duration"] is not None else None
+        trans = dict(m["transcription"])
+        if not m["n_segments"] and not trans:
+            return {}
+        texts = _unpack_strings(self._array("seg_txt"), m["n_segments"])
+        segments = [{"start": s, "end": e, "text": t, "words": [], "fillers": []} for (s, e), t in zip(self._array("seg").tolist(), texts)]
+        words = _unpack_strings(self._array("wrd_txt"), m["n_words"])
+        for (s, e), p, k, f, w in zip(self._array("wrd").tolist(), self._array("wrd_prob").tolist(), self._array("wrd_seg").tolist(), self._array("wrd_fil").tolist(), words):
+            wi = {"word": w, "start": s, "end": e, "probability": p}
+            segments[k]["words"].append(wi)
+            if f:
+                segments[k]["fillers"].append(wi)
+        trans.update(text=" ".join(texts), segments=segments, filler_segments=self["filler_segments"])
+        return trans
+
+    def __missing__(self, key):
+        if key not in LAZY_KEYS:
+            raise KeyError(key)
+        value = self._load(key)
+        self[key] = value
+        return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in LAZY_KEYS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def materialize(self):
+        for key in LAZY_KEYS:
+            self[key]
+        return self
+
+def save_project(analyses, path):
+    sources = {a._source for a in analyses if isinstance(a, LazyAnalysis)}
+    for a in analyses:
+        if isinstance(a, LazyAnalysis):
+            a.materialize()
+    for src in sources:
+        src.close()
+    arrays = {}
+    headers = [_pack_clip(i, a, arrays) for i, a in enumerate(analyses)]
+    arrays["header"] = np.frombuffer(json.dumps({"version": STORE_VERSION, "clips": headers}, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    return path
+
+def is_project_store(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == b"PK\x03\x04"
+    except OSError:
+        return False
+
+def load_project(path):
+    if not is_project_store(path):
+        if path.endswith(".npz"):
+            raise ValueError(f"File progetto non valido: {path}")
+        analyses = load_analysis(path)
+        if isinstance(analyses, dict):
+            analyses = [analyses]
+        try:
+            save_project(analyses, os.path.splitext(path)[0] + ".npz")
+        except OSError:
+            pass
+        return analyses
+    source = _Source(path)
+    header = json.loads(source.array("header").tobytes().decode("utf-8"))
+    return [LazyAnalysis(h, source, i) for i, h in enumerate(header["clips"])]
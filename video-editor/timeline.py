@@ -1,60 +1,214 @@
 import os
+from bisect import bisect_left
+import numpy as np
+
+SEGMENT_TYPES = ["speech", "silence", "filler", "best_scene"]
+_TYPE_CODES = {t: i for i, t in enumerate(SEGMENT_TYPES)}
+
+def type_code(segment_type):
+    code = _TYPE_CODES.get(segment_type)
+    if code is None:
+        SEGMENT_TYPES.append(segment_type)
+        code = _TYPE_CODES[segment_type] = len(SEGMENT_TYPES) - 1
+    return code
 
 class Segment:
+    __slots__ = ("video_path", "start", "end", "clip_label", "segment_type", "score", "keep")
+
     def __init__(self, video_path, start, end, clip_label="", segment_type="speech"):
         self.video_path = video_path
         self.start = start
         self.end = end
-        self.duration = end - start
         self.clip_label = clip_label
         self.segment_type = segment_type
         self.score = 0.0
         self.keep = True
 
+    @property
+    def duration(self):
+        return self.end - self.start
+
     def to_dict(self):
         return {"video_path": self.video_path, "start": round(self.start,3), "end": round(self.end,3), "duration": round(self.duration,3), "clip_label": self.clip_label, "segment_type": self.segment_type, "score": round(self.score,3), "keep": self.keep}
 
-def build_segments_from_analysis(analysis):
-    video_path = analysis["video_path"]
-    label = analysis["filename"]
+class SegmentTable:
+    def __init__(self, sources=(), src=(), start=(), end=(), score=None, keep=None, kind=None):
+        self.sources = list(sources)
+        self.src = np.asarray(src, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        n = len(self.start)
+        self.score = np.zeros(n) if score is None else np.asarray(score, dtype=np.float64)
+        self.keep = np.ones(n, dtype=bool) if keep is None else np.asarray(keep, dtype=bool)
+        self.kind = np.zeros(n, dtype=np.int16) if kind is None else np.asarray(kind, dtype=np.int16)
+
+    @classmethod
+    def from_segments(cls, segments):
+        index = {}
+        src = [index.setdefault((s.video_path, s.clip_label), len(index)) for s in segments]
+        return cls(list(index), src, [s.start for s in segments], [s.end for s in segments], [s.score for s in segments], [s.keep for s in segments], [type_code(s.segment_type) for s in segments])
+
+    @classmethod
+    def concat(cls, tables):
+        tables = list(tables)
+        if not tables:
+            return cls()
+        sources, srcs = [], []
+        for t in tables:
+            srcs.append(t.src + len(sources))
+            sources += t.sources
+        return cls(sources, np.concatenate(srcs), np.concatenate([t.start for t in tables]), np.concatenate([t.end for t in tables]),
+                   np.concatenate([t.score for t in tables]), np.concatenate([t.keep for t in tables]), np.concatenate([t.kind for t in tables]))
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def take(self, index, **columns):
+        cols = {name: getattr(self, name)[index] for name in ("src", "start", "end", "score", "keep", "kind")}
+        cols.update(columns)
+        return SegmentTable(self.sources, **cols)
+
+    def replace(self, **columns):
+        return self.take(slice(None), **columns)
+
+    def segment(self, i):
+        video_path, label = self.sources[self.src[i]]
+        seg = Segment(video_path, float(self.start[i]), float(self.end[i]), label, SEGMENT_TYPES[self.kind[i]])
+        seg.score = float(self.score[i])
+        seg.keep = bool(self.keep[i])
+        return seg
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(i)
+        return self.segment(range(len(self))[i])
+
+    def __iter__(self):
+        return iter(self.segments())
+
+    def segments(self):
+        types = SEGMENT_TYPES
+        out = []
+        for s, a, b, sc, k, t in zip(self.src.tolist(), self.start.tolist(), self.end.tolist(), self.score.tolist(), self.keep.tolist(), self.kind.tolist()):
+            video_path, label = self.sources[s]
+            seg = Segment(video_path, a, b, label, types[t])
+            seg.score = sc
+            seg.keep = k
+            out.append(seg)
+        return out
+
+def as_table(segments):
+    return segments if isinstance(segments, SegmentTable) else SegmentTable.from_segments(segments)
+
+class SceneIndex:
+    def __init__(self, best_scenes):
+        table = {round(b["timestamp"],1): b["score"] for b in best_scenes}
+        rank = {ts: i for i, ts in enumerate(table)}
+        self.times = sorted(table)
+        self.scores = [table[ts] for ts in self.times]
+        self.ranks = [rank[ts] for ts in self.times]
+
+    def __len__(self):
+        return len(self.times)
+
+    def score_near(self, t, window=2.0):
+        i = max(0, bisect_left(self.times, t - window) - 1)
+        best = None
+        while i < len(self.times) and self.times[i] <= t + window + 1e-6:
+            if abs(t - self.times[i]) < window and (best is None or self.ranks[i] < self.ranks[best]):
+                best = i
+            i += 1
+        return None if best is None else self.scores[best]
+
+    def scores_near(self, ts, window=2.0, chunk=65536):
+        ts = np.asarray(ts, dtype=np.float64)
+        out = np.full(len(ts), np.nan)
+        if not self.times or not len(ts):
+            return out
+        times, ranks, scores = np.asarray(self.times), np.asarray(self.ranks), np.asarray(self.scores, dtype=np.float64)
+        lo = np.maximum(0, np.searchsorted(times, ts - window, side="left") - 1)
+        hi = np.searchsorted(times, ts + window + 1e-6, side="right")
+        width = max(1, int((hi - lo).max()))
+        for c in range(0, len(ts), chunk):
+            t, l, h = ts[c:c+chunk], lo[c:c+chunk], hi[c:c+chunk]
+            idx = l[:, None] + np.arange(width)
+            valid = idx < h[:, None]
+            idx = np.minimum(idx, len(times) - 1)
+            valid &= np.abs(t[:, None] - times[idx]) < window
+            best = np.where(valid, ranks[idx], len(times)).argmin(axis=1)
+            rows = np.arange(len(t))
+            out[c:c+chunk] = np.where(valid[rows, best], scores[idx[rows, best]], np.nan)
+        return out
+
+class BeatGrid:
+    def __init__(self, beat_times):
+        self.times = sorted(set(float(b) for b in beat_times))
+
+    def __len__(self):
+        return len(self.times)
+
+    def nearest(self, t):
+        i = bisect_left(self.times, t)
+        if i == 0:
+            return self.times[0]
+        if i == len(self.times):
+            return self.times[-1]
+        lo, hi = self.times[i-1], self.times[i]
+        return hi if abs(hi-t) < abs(lo-t) else lo
+
+    def snap(self, t, tolerance=0.15):
+        best = self.nearest(t)
+        return best if abs(best-t) <= tolerance else t
+
+    def snap_many(self, ts, tolerance=0.15):
+        ts = np.asarray(ts, dtype=np.float64)
+        grid = np.asarray(self.times, dtype=np.float64)
+        i = np.searchsorted(grid, ts, side="left")
+        lo = grid[np.clip(i - 1, 0, len(grid) - 1)]
+        hi = grid[np.clip(i, 0, len(grid) - 1)]
+        best = np.where(i == 0, grid[0], np.where(i == len(grid), grid[-1], np.where(np.abs(hi - ts) < np.abs(lo - ts), hi, lo)))
+        return np.where(np.abs(best - ts) <= tolerance, best, ts)
+
+SPEECH, SILENCE, FILLER = type_code("speech"), type_code("silence"), type_code("filler")
+
+def build_segment_table(analysis):
     duration = analysis["duration"]
     silences = analysis.get("silences", [])
     fillers = analysis.get("filler_segments", [])
-    best_scenes = analysis.get("best_scenes", [])
-
-    bad_intervals = []
-    for s in silences:
-        bad_intervals.append((s["start"], s["end"], "silence"))
-    for f in fillers:
-        bad_intervals.append((max(0, f["start"]-0.1), f["end"]+0.1, "filler"))
-    bad_intervals.sort(key=lambda x: x[0])
-
-    segments = []
-    current_pos = 0.0
-    for bad_start, bad_end, bad_type in bad_intervals:
-        bad_start = max(bad_start, 0.0)
-        bad_end = min(bad_end, duration)
-        if bad_start > current_pos + 0.05:
-            seg = Segment(video_path, current_pos, bad_start, label, "speech")
-            segments.append(seg)
-        bad_seg = Segment(video_path, bad_start, bad_end, label, bad_type)
-        bad_seg.keep = False
-        segments.append(bad_seg)
-        current_pos = max(current_pos, bad_end)
-    if current_pos < duration - 0.1:
-        segments.append(Segment(video_path, current_pos, duration, label, "speech"))
-
-    best_timestamps = {round(b["timestamp"],1): b["score"] for b in best_scenes}
-    for seg in segments:
-        if seg.keep:
-            center = (seg.start + seg.end) / 2
-            for ts, sc in best_timestamps.items():
-                if abs(center - ts) < 2.0:
-                    seg.score = sc
-                    break
-    return segments
+    bad_start = np.array([s["start"] for s in silences] + [max(0, f["start"]-0.1) for f in fillers], dtype=np.float64)
+    bad_end = np.array([s["end"] for s in silences] + [f["end"]+0.1 for f in fillers], dtype=np.float64)
+    bad_kind = np.array([SILENCE]*len(silences) + [FILLER]*len(fillers), dtype=np.int16)
+    order = np.argsort(bad_start, kind="stable")
+    bad_start = np.maximum(bad_start[order], 0.0)
+    bad_end = np.minimum(bad_end[order], duration)
+    bad_kind = bad_kind[order]
+    pos = np.maximum.accumulate(np.concatenate(([0.0], bad_end)))
+    n = len(bad_start)
+    start, end = np.empty(2*n), np.empty(2*n)
+    kind, keep, valid = np.empty(2*n, dtype=np.int16), np.empty(2*n, dtype=bool), np.ones(2*n, dtype=bool)
+    start[0::2], end[0::2], kind[0::2], keep[0::2] = pos[:-1], bad_start, SPEECH, True
+    start[1::2], end[1::2], kind[1::2], keep[1::2] = bad_start, bad_end, bad_kind, False
+    valid[0::2] = bad_start > pos[:-1] + 0.05
+    start, end, kind, keep = start[valid], end[valid], kind[valid], keep[valid]
+    if pos[-1] < duration - 0.1:
+        start, end = np.append(start, pos[-1]), np.append(end, duration)
+        kind, keep = np.append(kind, SPEECH), np.append(keep, True)
+    score = np.zeros(len(start))
+    scene_index = SceneIndex(analysis.get("best_scenes", []))
+    if scene_index:
+        kept = np.flatnonzero(keep)
+        sc = scene_index.scores_near((start[kept] + end[kept]) / 2)
+        score[kept] = np.where(np.isnan(sc), 0.0, sc)
+    return SegmentTable([(analysis["video_path"], analysis["filename"])], np.zeros(len(start), dtype=np.int32), start, end, score, keep, kind)
 
-def auto_cut_timeline(analyses, options=None):
+def build_segments_from_analysis(analysis):
+    return build_segment_table(analysis).segments()
+
+def auto_cut_table(analyses, options=None):
     if options is None:
         options = {}
     remove_silences = options.get("remove_silences", True)
@@ -63,72 +217,62 @@ def auto_cut_timeline(analyses, options=None):
     max_duration = options.get("max_total_duration", None)
     padding = options.get("padding_seconds", 0.05)
 
-    all_segments = []
-    for analysis in analyses:
-        segs = build_segments_from_analysis(analysis)
-        for seg in segs:
-            if seg.keep:
-                seg.start = seg.start + padding
-                seg.end = seg.end - padding
-                seg.duration = seg.end - seg.start
-            if not seg.keep:
-                continue
-            if seg.duration < min_seg_dur:
-                continue
-            if seg.segment_type == "silence" and remove_silences:
-                continue
-            if seg.segment_type == "filler" and remove_fillers:
-                continue
-            all_segments.append(seg)
+    table = SegmentTable.concat(build_segment_table(a) for a in analyses)
+    start = np.where(table.keep, table.start + padding, table.start)
+    end = np.where(table.keep, table.end - padding, table.end)
+    mask = table.keep & ~(end - start < min_seg_dur)
+    if remove_silences:
+        mask &= table.kind != SILENCE
+    if remove_fillers:
+        mask &= table.kind != FILLER
+    table = table.take(mask, start=start[mask], end=end[mask])
 
     if max_duration:
-        selected = []
-        total = 0.0
-        for seg in all_segments:
-            if total + seg.duration > max_duration:
-                remaining = max_duration - total
-                if remaining > min_seg_dur:
-                    clipped = Segment(seg.video_path, seg.start, seg.start+remaining, seg.clip_label, seg.segment_type)
-                    clipped.score = seg.score
-                    selected.append(clipped)
-                break
-            selected.append(seg)
-            total += seg.duration
-        all_segments = selected
-
-    return all_segments
+        table = trim_to_duration(table, max_duration, min_seg_dur)[0]
+    return table
+
+def trim_to_duration(table, max_duration, min_seg_dur=0.3, used=0.0):
+    total = np.cumsum(np.concatenate(([used], table.duration)))[1:]
+    over = np.flatnonzero(total > max_duration)
+    if not len(over):
+        return table, float(total[-1]) if len(total) else used, False
+    n = int(over[0])
+    remaining = max_duration - (total[n-1] if n else used)
+    if remaining > min_seg_dur:
+        end = table.end[:n+1].copy()
+        end[n] = table.start[n] + remaining
+        return table.take(slice(0, n+1), end=end, keep=np.ones(n+1, dtype=bool)), max_duration, True
+    return table.take(slice(0, n)), max_duration, True
+
+def auto_cut_timeline(analyses, options=None):
+    return auto_cut_table(analyses, options).segments()
 
 def sync_to_beats(segments, beat_times, tolerance=0.15):
-    if not beat_times:
+    if not len(beat_times):
         return segments
-    def nearest_beat(t):
-        best = min(beat_times, key=lambda b: abs(b-t))
-        return best if abs(best-t) <= tolerance else t
-    snapped = []
-    for seg in segments:
-        ns = nearest_beat(seg.start)
-        ne = nearest_beat(seg.end)
-        if ne <= ns:
-            ne = seg.end
-        new_seg = Segment(seg.video_path, ns, ne, seg.clip_label, seg.segment_type)
-        new_seg.score = seg.score
-        new_seg.keep = seg.keep
-        snapped.append(new_seg)
-    return snapped
+    grid = beat_times if isinstance(beat_times, BeatGrid) else BeatGrid(beat_times)
+    table = as_table(segments)
+    ns = grid.snap_many(table.start, tolerance)
+    ne = grid.snap_many(table.end, tolerance)
+    snapped = table.replace(start=ns, end=np.where(ne <= ns, table.end, ne))
+    return snapped if isinstance(segments, SegmentTable) else snapped.segments()
 
 def timeline_stats(segments):
-    if not segments:
+    if not len(segments):
         return {"total_duration": 0, "n_segments": 0}
-    total = sum(s.duration for s in segments)
-    by_type = {}
-    for seg in segments:
-        by_type[seg.segment_type] = by_type.get(seg.segment_type, 0) + seg.duration
-    return {"total_duration": round(total,2), "n_segments": len(segments), "by_type": {k: round(v,2) for k,v in by_type.items()}, "avg_segment_duration": round(total/len(segments),2)}
+    table = as_table(segments)
+    dur = table.duration
+    total = float(dur.sum())
+    kinds, first = np.unique(table.kind, return_index=True)
+    sums = np.bincount(table.kind, weights=dur)
+    by_type = {SEGMENT_TYPES[k]: round(float(sums[k]),2) for k in kinds[np.argsort(first)].tolist()}
+    return {"total_duration": round(total,2), "n_segments": len(table), "by_type": by_type, "avg_segment_duration": round(total/len(table),2)}
 
 def format_timeline_for_display(segments):
+    table = as_table(segments)
+    dur = table.duration
+    pos = np.concatenate(([0.0], np.cumsum(dur)))
     result = []
-    pos = 0.0
-    for i, seg in enumerate(segments):
-        result.append({"index": i+1, "source_file": seg.clip_label, "source_start": round(seg.start,2), "source_end": round(seg.end,2), "duration": round(seg.duration,2), "timeline_start": round(pos,2), "timeline_end": round(pos+seg.duration,2), "type": seg.segment_type, "score": round(seg.score,1)})
-        pos += seg.duration
+    for i, (s, a, b, d, p, sc, k) in enumerate(zip(table.src.tolist(), table.start.tolist(), table.end.tolist(), dur.tolist(), pos.tolist(), table.score.tolist(), table.kind.tolist())):
+        result.append({"index": i+1, "source_file": table.sources[s][1], "source_start": round(a,2), "source_end": round(b,2), "duration": round(d,2), "timeline_start": round(p,2), "timeline_end": round(p+d,2), "type": SEGMENT_TYPES[k], "score": round(sc,1)})
     return result
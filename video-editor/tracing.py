@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+import subprocess
+
+_tracer = None
+_enable_lock = threading.Lock()
+_local = threading.local()
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def set(self, **args):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start", "tid")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack and "clip" not in self.args and "clip" in stack[-1].args:
+            self.args["clip"] = stack[-1].args["clip"]
+        stack.append(self)
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _local.stack.pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def _record(self, span, end):
+        with self._lock:
+            self.events.append((span.name, span.cat, span.start - self._t0, end - span.start, span.tid, span.args))
+
+    def summary(self):
+        out = {}
+        with self._lock:
+            events = list(self.events)
+        for name, cat, start, dur, tid, args in events:
+            s = out.setdefault((cat, name), {"count": 0, "total": 0.0, "max": 0.0, "bytes_in": 0, "bytes_out": 0, "errors": 0})
+            s["count"] += 1
+            s["total"] += dur
+            s["max"] = max(s["max"], dur)
+            s["bytes_in"] += args.get("bytes_in", 0)
+            s["bytes_out"] += args.get("bytes_out", 0)
+            s["errors"] += "error" in args or args.get("exit_code", 0) != 0
+        return out
+
+    def clip_totals(self):
+        out = {}
+        with self._lock:
+            for name, cat, start, dur, tid, args in self.events:
+                if cat == "clip":
+                    out[args.get("clip", "?")] = out.get(args.get("clip", "?"), 0.0) + dur
+        return out
+
+    def format_summary(self, top_clips=5):
+        lines = []
+        for (cat, name), s in sorted(self.summary().items(), key=lambda kv: -kv[1]["total"]):
+            line = f"  {cat} {name}: {s['count']}x, totale {s['total']:.2f}s, max {s['max']:.2f}s"
+            if s["bytes_in"] or s["bytes_out"]:
+                line += f", {s['bytes_in']/1048576:.1f} MB in, {s['bytes_out']/1048576:.1f} MB out"
+            if s["errors"]:
+                line += f", {s['errors']} errori"
+            lines.append(line)
+        clips = sorted(self.clip_totals().items(), key=lambda kv: -kv[1])[:top_clips]
+        if clips:
+            lines.append("  clip più lente: " + ", ".join(f"{c} {d:.1f}s" for c, d in clips))
+        return "\n".join(lines)
+
+    def to_chrome(self):
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return {"traceEvents": [{"name": name, "cat": cat, "ph": "X", "ts": round(start*1e6, 1), "dur": round(dur*1e6, 1), "pid": pid, "tid": tid, "args": args}
+                                for name, cat, start, dur, tid, args in events], "displayTimeUnit": "ms"}
+
+    def dump_chrome(self, path):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, default=str)
+        return path
+
+def enable():
+    global _tracer
+    with _enable_lock:
+        if _tracer is not None:
+            return None
+        _tracer = Tracer()
+        return _tracer
+
+def disable(tracer=None):
+    global _tracer
+    if tracer is None or _tracer is tracer:
+        _tracer = None
+
+def active():
+    return _tracer
+
+def span(name, cat="stage", **args):
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, cat, args)
+
+def _input_bytes(cmd):
+    total = 0
+    for i, arg in enumerate(cmd[:-1]):
+        if arg == "-i" and os.path.isfile(cmd[i+1]):
+            total += os.path.getsize(cmd[i+1])
+    return total
+
+def subprocess_span(cmd):
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, os.path.basename(cmd[0]), "subprocess", {"bytes_in": _input_bytes(cmd), "argv": " ".join(map(str, cmd))[:500]})
+
+def output_bytes(path):
+    return os.path.getsize(path) if _tracer is not None and os.path.isfile(path) else 0
+
+def run(cmd, **kwargs):
+    if _tracer is None:
+        return subprocess.run(cmd, **kwargs)
+    with subprocess_span(cmd) as sp:
+        result = subprocess.run(cmd, **kwargs)
+        out = len(result.stdout) if result.stdout else 0
+        if cmd[0] == "ffmpeg" and result.returncode == 0:
+            out += output_bytes(cmd[-1])
+        sp.set(exit_code=result.returncode, bytes_out=out)
+    return result